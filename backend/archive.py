@@ -0,0 +1,111 @@
+"""
+Streamed ZIP archives of photos, built on the fly.
+
+Nothing is staged on disk; at most ``ARCHIVE_PREFETCH`` photos are held in memory.
+"""
+
+from __future__ import annotations
+
+import os
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List
+from urllib.parse import quote
+
+from config import settings
+from models import Photo
+from storage import StorageClient
+
+
+class _Sink:
+    """Write-only, non-seekable buffer; ``drain()`` hands back what was written."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def archive_entries(photos: List[Photo]) -> List[tuple]:
+    """Snapshot ``(name, object_key, created_at)`` for each photo.
+
+    Call this while the session is still open — the stream itself runs after
+    the request's session is gone.  Names are the original filenames,
+    de-duplicated as ``name (2).ext`` like a desktop would.
+    """
+    seen: dict = {}
+    entries = []
+    for photo in photos:
+        name = os.path.basename(photo.original_filename or photo.filename) or photo.filename
+        count = seen.get(name.lower(), 0) + 1
+        seen[name.lower()] = count
+        if count > 1:
+            stem, ext = os.path.splitext(name)
+            name = f"{stem} ({count}){ext}"
+        entries.append((name, photo.object_key, photo.created_at))
+    return entries
+
+
+def stream_zip(storage: StorageClient, entries: List[tuple]) -> Iterator[bytes]:
+    """Yield a ZIP of ``archive_entries()`` chunk by chunk (one chunk per entry)."""
+    window = max(1, settings.archive_prefetch)
+    missing = []
+    sink = _Sink()
+
+    with ThreadPoolExecutor(max_workers=window) as pool, \
+            zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED, allowZip64=True) as zf:
+        pending: deque = deque()
+        todo = iter(entries)
+
+        def _fill():
+            while len(pending) < window:
+                job = next(todo, None)
+                if job is None:
+                    return
+                pending.append((job, pool.submit(storage.get_object, job[1])))
+
+        _fill()
+        while pending:
+            (name, key, created_at), future = pending.popleft()
+            _fill()
+            try:
+                data = future.result()
+            except Exception as e:
+                print(f"Archive warning: {key}: {e}")
+                missing.append(key)
+                continue
+            info = zipfile.ZipInfo(name, date_time=_zip_time(created_at))
+            info.compress_type = zipfile.ZIP_STORED
+            zf.writestr(info, data)
+            del data
+            yield sink.drain()
+
+        if missing:
+            zf.writestr("MISSING.txt", "\n".join(missing) + "\n")
+    # Closing the ZipFile wrote the central directory
+    yield sink.drain()
+
+
+def _zip_time(dt) -> tuple:
+    # ZIP timestamps can't predate 1980
+    if dt is None or dt.year < 1980:
+        return (1980, 1, 1, 0, 0, 0)
+    return dt.timetuple()[:6]
+
+
+def content_disposition(name: str) -> str:
+    """``attachment`` header with an ASCII fallback plus the UTF-8 name."""
+    fallback = name.encode("ascii", "ignore").decode() or "photos"
+    fallback = fallback.replace('"', "")
+    return f"attachment; filename=\"{fallback}.zip\"; filename*=UTF-8''{quote(name)}.zip"
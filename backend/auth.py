@@ -1,3 +1,7 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from typing import Optional
 
@@ -8,12 +12,16 @@ from passlib.context import CryptContext
 from pydantic import BaseModel
 
 from config import settings
+from database import SessionLocal, insert_ignore
+from models import RevokedToken
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
 ALGORITHM = "HS256"
 
+MISS = object()
+
 
 class Token(BaseModel):
     access_token: str
@@ -50,18 +58,119 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return jwt.encode(to_encode, settings.secret_key, algorithm=ALGORITHM)
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme)) -> str:
+class TokenCache:
+    """Per-worker LRU of verified token -> claims, or ``None`` once revoked.
+
+    Logouts reach other workers through ``revoked_tokens`` within ``ttl`` seconds.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 300.0, clock=time.time):
+        self._entries: OrderedDict[str, tuple] = OrderedDict()
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _store(self, token: str, claims: Optional[dict], until: float) -> None:
+        self._entries[token] = (claims, until)
+        self._entries.move_to_end(token)
+        while len(self._entries) > self._max_entries:
+            # Never evict a revocation to make room: drop the oldest verified
+            # entry instead, and only fall back to revocations if that's all
+            # there is.
+            victim = next(
+                (k for k, (c, _) in self._entries.items() if c is not None),
+                next(iter(self._entries)),
+            )
+            del self._entries[victim]
+
+    def get(self, token: str):
+        """Return cached claims, ``None`` if revoked, or ``MISS``."""
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return MISS
+            claims, until = entry
+            if until <= self._clock():
+                del self._entries[token]
+                return MISS
+            self._entries.move_to_end(token)
+            return claims
+
+    def put(self, token: str, claims: dict) -> None:
+        exp = float(claims.get("exp", 0))
+        with self._lock:
+            current = self._entries.get(token)
+            if current is not None and current[0] is None:
+                return  # revoked in the meantime
+            self._store(token, claims, min(exp, self._clock() + self._ttl))
+
+    def revoke(self, token: str, exp: float) -> None:
+        with self._lock:
+            self._store(token, None, exp)
+
+
+token_cache = TokenCache(
+    max_entries=settings.token_cache_max_entries,
+    ttl=settings.token_cache_ttl_seconds,
+)
+
+
+def _digest(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def _verify(token: str) -> Optional[dict]:
+    """Return the token's claims if it is valid and not revoked, else None."""
+    cached = token_cache.get(token)
+    if cached is not MISS:
+        return cached
+    try:
+        claims = jwt.decode(token, settings.secret_key, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    with SessionLocal() as db:
+        revoked = db.get(RevokedToken, _digest(token)) is not None
+    if revoked:
+        token_cache.revoke(token, float(claims.get("exp", 0)))
+        return None
+    token_cache.put(token, claims)
+    return claims
+
+
+def revoke_token(token: str) -> None:
+    """Deny ``token`` in every worker until its ``exp``; invalid tokens are ignored."""
+    try:
+        claims = jwt.decode(token, settings.secret_key, algorithms=[ALGORITHM])
+    except JWTError:
+        return
+    exp = float(claims.get("exp", 0))
+    with SessionLocal() as db:
+        # Expired rows are useless (jwt.decode rejects those tokens anyway)
+        db.query(RevokedToken).filter(
+            RevokedToken.expires_at < datetime.utcnow(),
+        ).delete(synchronize_session=False)
+        insert_ignore(db, RevokedToken, [
+            {"token_sha256": _digest(token), "expires_at": datetime.utcfromtimestamp(exp)},
+        ])
+        db.commit()
+    token_cache.revoke(token, exp)
+
+
+def get_current_user(token: str = Depends(oauth2_scheme)) -> str:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="无法验证凭据",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-    except JWTError:
+    payload = _verify(token)
+    if payload is None:
+        raise credentials_exception
+    username: str = payload.get("sub")
+    if username is None:
         raise credentials_exception
     if username != settings.admin_username:
         raise credentials_exception
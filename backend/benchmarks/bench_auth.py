@@ -0,0 +1,110 @@
+"""
+Admin auth overhead: JWT verification with and without the token cache.
+
+    cd backend && python benchmarks/bench_auth.py [-n 20000] [--rounds 7]
+
+Reports the cost of ``get_current_user`` on its own (cold decode vs cache
+hit) and of a full admin request through FastAPI's dependency system, so the
+per-request auth tax of bulk admin flows is visible.  Every case is warmed
+up, then the cases are run round-robin ``--rounds`` times and the fastest
+round is reported, so drift (CPU frequency, GC) hits them all alike and
+noise only ever adds time.  A cold verification also checks the shared
+``revoked_tokens`` table, so the benchmark points ``DB_URL`` at a throwaway
+SQLite file.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.environ["DB_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench_auth.db")
+
+from fastapi import Depends, FastAPI  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+import auth  # noqa: E402
+import database  # noqa: E402
+from auth import create_access_token, get_current_user, token_cache  # noqa: E402
+from config import settings  # noqa: E402
+
+
+def _per_call_us(fn, n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def _interleaved(cases: dict, n: int, rounds: int, counts: Optional[dict] = None) -> dict:
+    """Fastest per-call µs of each case over ``rounds`` round-robin runs.
+
+    ``counts`` overrides ``n`` for the cases it names.
+    """
+    counts = {name: (counts or {}).get(name, n) for name in cases}
+    for name, fn in cases.items():
+        _per_call_us(fn, max(1, counts[name] // 10))  # warm-up
+    samples = {name: [] for name in cases}
+    for _ in range(rounds):
+        for name, fn in cases.items():
+            samples[name].append(_per_call_us(fn, counts[name]))
+    return {name: min(runs) for name, runs in samples.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("-n", type=int, default=20000, help="iterations per case and round")
+    parser.add_argument("--rounds", type=int, default=7, help="round-robin repetitions")
+    args = parser.parse_args()
+
+    database.Base.metadata.create_all(bind=database.engine)
+    token = create_access_token({"sub": settings.admin_username})
+    verify = lambda: get_current_user(token)  # noqa: E731
+
+    def cold():
+        auth.token_cache = token_cache.__class__(max_entries=1)
+        verify()
+
+    def cached():
+        auth.token_cache = token_cache
+        verify()
+
+    # A cold call is a decode + DB lookup each, so it gets fewer iterations
+    dependency = _interleaved(
+        {"cold": cold, "cached": cached}, args.n, args.rounds,
+        counts={"cold": max(1, args.n // 10)},
+    )
+    results = {
+        "dependency_cold_us": dependency["cold"],
+        "dependency_cached_us": dependency["cached"],
+    }
+
+    app = FastAPI()
+
+    @app.get("/admin-noop")
+    def admin_noop(_user: str = Depends(get_current_user)):
+        return {}
+
+    @app.get("/public-noop")
+    def public_noop():
+        return {}
+
+    client = TestClient(app)
+    headers = {"Authorization": f"Bearer {token}"}
+    http = _interleaved({
+        "public": lambda: client.get("/public-noop"),
+        "admin": lambda: client.get("/admin-noop", headers=headers),
+    }, max(1, args.n // 10), args.rounds)
+    results["request_public_us"] = http["public"]
+    results["request_admin_cached_us"] = http["admin"]
+    results["request_auth_overhead_us"] = http["admin"] - http["public"]
+
+    print(json.dumps({k: round(v, 2) for k, v in results.items()}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+"""
+Load test of the API against a local stand-in stack.
+
+    cd backend && python benchmarks/bench_load.py --photos 10000 --requests 5000 \\
+        [--db-url sqlite:///bench.db | mysql+pymysql://...] [--out results.json]
+
+Boots ``main.app`` in-process against SQLite (default, a temp file) or any
+local database given by ``--db-url``, with ``STORAGE_BACKEND=memory`` so no
+object storage is needed.  Seeds ``--photos`` synthetic rows (bulk inserts,
+fine for 10k–1M), then drives a weighted mix of realistic traffic:
+
+- ``scroll``:   gallery pages, all photos and per category, going deeper
+- ``lightbox``: photo view counter posts as the user opens photos
+- ``counters``: download + site view counters
+- ``upload``:   admin photo uploads of a small generated JPEG
+
+and prints p50/p95/p99 latency (ms) and throughput per endpoint as JSON, so
+runs can be diffed over time.  Rate limiting is disabled so the counters hit
+the database; pass ``--rate-limit`` to measure with it on.
+"""
+
+import argparse
+import io
+import itertools
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+CATEGORIES = ["landscape", "portrait", "street", "travel", "night"]
+MIXES = {
+    "scroll": 60,
+    "lightbox": 25,
+    "counters": 13,
+    "upload": 2,
+}
+
+
+def _configure(args) -> None:
+    """Point settings at the stand-in stack; must run before importing the app."""
+    db_url = args.db_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    os.environ.update({
+        "DB_URL": db_url,
+        "STORAGE_BACKEND": "memory",
+        "AUTO_MIGRATE": "true",
+        "SNAPSHOT_ENABLED": "false",
+        "RATE_LIMIT_ENABLED": "true" if args.rate_limit else "false",
+    })
+    sys.path.insert(0, BACKEND_DIR)
+
+
+# ---------------------------------------------------------------------------
+# Synthetic data
+# ---------------------------------------------------------------------------
+def synthetic_photos(n: int, seed: int = 0):
+    """Yield ``n`` plausible ``photos`` rows as dicts (deterministic per seed)."""
+    from config import settings
+
+    rng = random.Random(seed)
+    start = datetime(2020, 1, 1)
+    for i in range(n):
+        photo_id = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+        category = rng.choice(CATEGORIES)
+        key = f"{category}/{photo_id}.jpg"
+        landscape = rng.random() < 0.6
+        yield {
+            "id": photo_id,
+            "filename": f"{photo_id}.jpg",
+            "original_filename": f"IMG_{i:07d}.JPG",
+            "object_key": key,
+            "url": f"{settings.public_url}/{key}",
+            "category": category,
+            "title": f"Photo {i}" if rng.random() < 0.5 else None,
+            "sort_order": rng.randint(0, 10),
+            "is_visible": rng.random() < 0.95,
+            "width": 6000 if landscape else 4000,
+            "height": 4000 if landscape else 6000,
+            "file_size": rng.randint(2_000_000, 25_000_000),
+            "content_type": "image/jpeg",
+            "view_count": rng.randint(0, 5000),
+            "download_count": rng.randint(0, 200),
+            "iso": rng.choice([100, 200, 400, 800, 1600]),
+            "aperture": rng.choice([1.4, 2.8, 4.0, 8.0]),
+            "created_at": start + timedelta(minutes=i),
+            "updated_at": start + timedelta(minutes=i),
+        }
+
+
+def seed_photos(n: int, batch: int = 10_000) -> list:
+    """Bulk-insert ``n`` synthetic photos; returns the visible photo IDs."""
+    from sqlalchemy import insert
+
+    import migrate
+    from database import SessionLocal
+    from models import Category, Photo
+
+    migrate.run()
+    visible = []
+    with SessionLocal() as db:
+        existing = {name for (name,) in db.query(Category.name)}
+        db.add_all([Category(name=c, display_name=c.title()) for c in CATEGORIES if c not in existing])
+        rows = []
+        for row in synthetic_photos(n):
+            rows.append(row)
+            if row["is_visible"]:
+                visible.append(row["id"])
+            if len(rows) >= batch:
+                db.execute(insert(Photo), rows)
+                rows = []
+        if rows:
+            db.execute(insert(Photo), rows)
+        db.commit()
+    return visible
+
+
+# ---------------------------------------------------------------------------
+# Traffic
+# ---------------------------------------------------------------------------
+_upload_seq = itertools.count(1)
+
+
+def _jpeg() -> bytes:
+    """A small JPEG with bytes no earlier upload had, so none is deduplicated."""
+    from PIL import Image
+
+    n = next(_upload_seq)
+    img = Image.new("RGB", (64, 48), (200, 120, 40))
+    for bit in range(32):  # n in binary along the top row, black / white
+        img.putpixel((bit, 0), (255, 255, 255) if n >> bit & 1 else (0, 0, 0))
+    buf = io.BytesIO()
+    img.save(buf, "JPEG")
+    return buf.getvalue()
+
+
+class Driver:
+    def __init__(self, client, photo_ids: list, token: str, seed: int):
+        self.client = client
+        self.photo_ids = photo_ids
+        self.auth = {"Authorization": f"Bearer {token}"}
+        self.rng = random.Random(seed)
+        self.samples = defaultdict(list)  # endpoint -> [seconds]
+
+    def _call(self, label: str, method: str, url: str, **kwargs) -> None:
+        start = time.perf_counter()
+        resp = self.client.request(method, url, **kwargs)
+        elapsed = time.perf_counter() - start
+        if resp.status_code >= 400:
+            label = f"{label} [{resp.status_code}]"
+        self.samples[label].append(elapsed)
+
+    def scroll(self):
+        category = self.rng.choice([None] + CATEGORIES)
+        params = {"limit": 20, "skip": 20 * min(int(self.rng.expovariate(0.3)), 50)}
+        if category:
+            params["category"] = category
+        self._call("GET /api/photos", "GET", "/api/photos", params=params)
+
+    def lightbox(self):
+        photo_id = self.rng.choice(self.photo_ids)
+        self._call("POST /api/photos/{id}/view", "POST", f"/api/photos/{photo_id}/view")
+
+    def counters(self):
+        if self.rng.random() < 0.5:
+            photo_id = self.rng.choice(self.photo_ids)
+            self._call(
+                "POST /api/photos/{id}/download", "POST", f"/api/photos/{photo_id}/download",
+            )
+        else:
+            self._call("POST /api/site/view", "POST", "/api/site/view")
+
+    def upload(self):
+        self._call(
+            "POST /api/photos", "POST", "/api/photos", headers=self.auth,
+            files={"file": ("bench.jpg", _jpeg(), "image/jpeg")},
+            data={"category": self.rng.choice(CATEGORIES)},
+        )
+
+    def run(self, n: int) -> None:
+        names = list(MIXES)
+        weights = [MIXES[k] for k in names]
+        for name in self.rng.choices(names, weights=weights, k=n):
+            getattr(self, name)()
+
+
+def _percentile(sorted_values: list, pct: float) -> float:
+    idx = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[idx]
+
+
+def summarize(samples: dict, wall: float) -> dict:
+    endpoints = {}
+    for label, values in sorted(samples.items()):
+        values = sorted(values)
+        endpoints[label] = {
+            "count": len(values),
+            "p50_ms": round(_percentile(values, 50) * 1e3, 2),
+            "p95_ms": round(_percentile(values, 95) * 1e3, 2),
+            "p99_ms": round(_percentile(values, 99) * 1e3, 2),
+            "mean_ms": round(sum(values) / len(values) * 1e3, 2),
+            "throughput_rps": round(len(values) / wall, 1),
+        }
+    total = sum(len(v) for v in samples.values())
+    return {"endpoints": endpoints, "total_requests": total, "total_rps": round(total / wall, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test against a local stand-in stack")
+    parser.add_argument("--photos", type=int, default=10_000, help="synthetic photos to seed")
+    parser.add_argument("--requests", type=int, default=5_000, help="total requests to send")
+    parser.add_argument("--concurrency", type=int, default=4, help="client threads")
+    parser.add_argument("--db-url", default="", help="SQLAlchemy URL (default: temp SQLite)")
+    parser.add_argument("--rate-limit", action="store_true", help="keep rate limiting on")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="also write the JSON report to this file")
+    args = parser.parse_args()
+
+    _configure(args)
+    from fastapi.testclient import TestClient
+
+    import main as api
+    from auth import create_access_token
+    from config import settings
+
+    t0 = time.perf_counter()
+    photo_ids = seed_photos(args.photos)
+    seed_seconds = time.perf_counter() - t0
+    token = create_access_token({"sub": settings.admin_username})
+
+    per_thread = args.requests // args.concurrency
+    drivers = []
+    with TestClient(api.app) as client:
+        # Warm up connection pool, caches and imports outside the measurement
+        Driver(client, photo_ids, token, seed=-1).run(50)
+        threads = []
+        for i in range(args.concurrency):
+            driver = Driver(client, photo_ids, token, seed=args.seed + i)
+            drivers.append(driver)
+            threads.append(threading.Thread(target=driver.run, args=(per_thread,)))
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        wall = time.perf_counter() - start
+
+    samples = defaultdict(list)
+    for driver in drivers:
+        for label, values in driver.samples.items():
+            samples[label].extend(values)
+
+    report = {
+        "config": {
+            "photos": args.photos,
+            "requests": per_thread * args.concurrency,
+            "concurrency": args.concurrency,
+            "db": settings.database_url.split("://", 1)[0],
+            "rate_limit": args.rate_limit,
+            "seed_seconds": round(seed_seconds, 2),
+        },
+        **summarize(samples, wall),
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Cold worker boot time.
+
+    cd backend && python benchmarks/bench_startup.py [-n 10] [--migrate]
+
+Starts a fresh interpreter per run, imports ``main`` and runs the app's
+lifespan startup, then reports median / max in milliseconds for:
+
+- ``process``:  interpreter start to ready (what a new uvicorn worker pays)
+- ``import``:   ``import main`` alone
+- ``lifespan``: startup hook (only non-trivial with ``--migrate``)
+
+Runs with ``AUTO_MIGRATE=false`` unless ``--migrate`` is given, in which case
+the configured database must be reachable.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+_CHILD = """
+import json, time
+t0 = time.perf_counter()
+import main
+t1 = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(main.app):
+    t2 = time.perf_counter()
+print(json.dumps({"import": (t1 - t0) * 1e3, "lifespan": (t2 - t1) * 1e3}))
+"""
+
+
+def _boot(migrate: bool) -> dict:
+    env = dict(os.environ, AUTO_MIGRATE="true" if migrate else "false")
+    start = time.perf_counter()
+    out = subprocess.run(
+        [sys.executable, "-c", _CHILD],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    total = (time.perf_counter() - start) * 1e3
+    result = json.loads(out.strip().splitlines()[-1])
+    result["process"] = total
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold worker boot time")
+    parser.add_argument("-n", type=int, default=10, help="number of cold boots")
+    parser.add_argument("--migrate", action="store_true", help="include migrate.run()")
+    args = parser.parse_args()
+
+    runs = [_boot(args.migrate) for _ in range(args.n)]
+    report = {}
+    for key in ("process", "import", "lifespan"):
+        values = [r[key] for r in runs]
+        report[key] = {
+            "median_ms": round(statistics.median(values), 1),
+            "max_ms": round(max(values), 1),
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Content-addressed, reference-counted photo storage.
+
+Identical uploads share one ``blobs/<sha[:2]>/<sha>-<nonce>.<ext>`` object; legacy
+photos (``blob_sha256`` NULL) keep their ``<category>/<id>.<ext>`` keys.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import secrets
+from typing import Optional, Tuple
+
+from fastapi import UploadFile
+from sqlalchemy.orm import Session
+
+from database import insert_ignore
+from models import Blob, Photo
+from storage import StorageClient
+
+CHUNK_SIZE = 1024 * 1024
+
+EXIF_FIELDS = (
+    "width", "height", "camera_make", "camera_model",
+    "iso", "aperture", "shutter_speed", "focal_length",
+)
+
+
+async def read_and_hash(file: UploadFile) -> Tuple[bytes, str]:
+    """Read the upload in chunks, hashing as it streams in."""
+    digest = hashlib.sha256()
+    chunks = []
+    while True:
+        chunk = await file.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        digest.update(chunk)
+        chunks.append(chunk)
+    return b"".join(chunks), digest.hexdigest()
+
+
+def blob_key(sha256: str, ext: str) -> str:
+    return f"blobs/{sha256[:2]}/{sha256}-{secrets.token_hex(4)}.{ext.lower()}"
+
+
+def _add_ref(db: Session, sha256: str) -> bool:
+    updated = db.query(Blob).filter(Blob.sha256 == sha256).update(
+        {Blob.ref_count: Blob.ref_count + 1}, synchronize_session=False,
+    )
+    return updated > 0
+
+
+def acquire(
+    db: Session, storage: StorageClient, sha256: str, data: bytes, ext: str,
+    content_type: str,
+) -> Tuple[str, bool]:
+    """Take a reference on the blob for ``data``; returns ``(object_key, deduplicated)``.
+
+    Does not commit.  A new object (``deduplicated`` False) goes to ``discard`` on rollback.
+    """
+    if _add_ref(db, sha256):
+        key = db.query(Blob.object_key).filter(Blob.sha256 == sha256).scalar()
+        return key, True
+    key = blob_key(sha256, ext)
+    storage.put_object(key, data, content_type)
+    try:
+        # A concurrent identical upload may have inserted the row meanwhile
+        insert_ignore(db, Blob, [{
+            "sha256": sha256, "object_key": key, "size": len(data),
+            "content_type": content_type, "ref_count": 0,
+        }])
+        _add_ref(db, sha256)
+        stored = db.query(Blob.object_key).filter(Blob.sha256 == sha256).scalar()
+    except Exception:
+        discard(storage, key)
+        raise
+    if stored != key:
+        discard(storage, key)  # lost the race; use the winner's object
+        return stored, True
+    return key, False
+
+
+def discard(storage: StorageClient, key: str) -> None:
+    """Delete an object ``acquire`` uploaded but no committed row points at."""
+    try:
+        storage.delete_object(key)
+    except Exception:
+        pass
+
+
+def sibling_exif(db: Session, sha256: str) -> Optional[dict]:
+    """EXIF fields from an existing photo with the same bytes, if any."""
+    columns = [getattr(Photo, f) for f in EXIF_FIELDS]
+    row = db.query(*columns).filter(Photo.blob_sha256 == sha256).first()
+    if row is None:
+        return None
+    return {f: v for f, v in zip(EXIF_FIELDS, row) if v is not None}
+
+
+def release(db: Session, sha256: str) -> Optional[str]:
+    """Drop one reference. Returns the object key to delete if it was the last.
+
+    Does not commit; delete the object only after the caller has committed.
+    """
+    db.query(Blob).filter(Blob.sha256 == sha256).update(
+        {Blob.ref_count: Blob.ref_count - 1}, synchronize_session=False,
+    )
+    key = db.query(Blob.object_key).filter(
+        Blob.sha256 == sha256, Blob.ref_count <= 0,
+    ).scalar()
+    if key is None:
+        return None
+    # Conditional delete: only the transaction that saw zero references wins
+    deleted = db.query(Blob).filter(
+        Blob.sha256 == sha256, Blob.ref_count <= 0,
+    ).delete(synchronize_session=False)
+    return key if deleted else None
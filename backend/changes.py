@@ -0,0 +1,84 @@
+"""
+Change feed for incremental sync (``GET /api/changes?since=<token>``).
+
+A compacted log of admin writes (one row per entity, deletes as tombstones).
+"""
+
+from __future__ import annotations
+
+from typing import Iterable, List
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+
+from database import insert_ignore
+from models import Change, Photo, Category, SiteStats
+
+PHOTO = "photo"
+CATEGORY = "category"
+
+UPSERT = "upsert"
+DELETE = "delete"
+
+SEQ_KEY = "change_seq"
+CHUNK_SIZE = 500  # ids per DELETE ... IN (...)
+
+
+def _allocate(db: Session, count: int) -> int:
+    """Reserve ``count`` consecutive ``seq`` values; returns the first.
+
+    The UPDATE holds the counter row's lock until the caller commits.
+    """
+    counter = db.query(SiteStats).filter(SiteStats.key == SEQ_KEY)
+    if not counter.update({SiteStats.value: SiteStats.value + count}, synchronize_session=False):
+        # First use: start after whatever the log already holds
+        start = db.query(func.coalesce(func.max(Change.seq), 0)).scalar()
+        insert_ignore(db, SiteStats, [{"key": SEQ_KEY, "value": start}])
+        counter.update({SiteStats.value: SiteStats.value + count}, synchronize_session=False)
+    return db.query(SiteStats.value).filter(SiteStats.key == SEQ_KEY).scalar() - count + 1
+
+
+def record(db: Session, entity_type: str, ids: Iterable[str], op: str = UPSERT) -> None:
+    """Log ``op`` for each id, replacing their older entries. Call right before committing."""
+    ids = list(dict.fromkeys(i for i in ids if i))
+    if not ids:
+        return
+    first = _allocate(db, len(ids))
+    for start in range(0, len(ids), CHUNK_SIZE):
+        chunk = ids[start:start + CHUNK_SIZE]
+        db.query(Change).filter(
+            Change.entity_type == entity_type, Change.entity_id.in_(chunk),
+        ).delete(synchronize_session=False)
+        db.execute(insert(Change), [
+            {"seq": first + start + n, "entity_type": entity_type, "entity_id": i, "op": op}
+            for n, i in enumerate(chunk)
+        ])
+
+
+def record_photos_where(db: Session, *criteria, op: str = UPSERT) -> None:
+    """``record`` for every photo matching ``criteria``.
+
+    Used after bulk UPDATEs (e.g. a category rename): the ids come from one
+    query, so the caller never loads the photos themselves.
+    """
+    record(db, PHOTO, db.scalars(select(Photo.id).where(*criteria)).all(), op)
+
+
+def backfill(db: Session) -> None:
+    """Seed an empty log with every existing photo and category. Does not commit."""
+    if db.query(Change.seq).first() is not None:
+        return
+    for entity_type, model in ((CATEGORY, Category), (PHOTO, Photo)):
+        ids = db.scalars(select(model.id).order_by(model.updated_at.asc())).all()
+        record(db, entity_type, ids)
+
+
+def since(db: Session, token: int, limit: int) -> List[Change]:
+    """The next ``limit`` log entries after ``token``, in ``seq`` order."""
+    return (
+        db.query(Change)
+        .filter(Change.seq > token)
+        .order_by(Change.seq.asc())
+        .limit(limit)
+        .all()
+    )
@@ -2,7 +2,7 @@ from pydantic_settings import BaseSettings
 
 
 class Settings(BaseSettings):
-    # Storage backend: "cos" (Tencent COS) or "minio"
+    # Storage backend: "cos" (Tencent COS), "minio", or "memory" (tests/benchmarks)
     storage_backend: str = "cos"
 
     # Tencent COS settings
@@ -24,6 +24,9 @@ class Settings(BaseSettings):
     db_user: str = "root"
     db_password: str = "mysql_root_secret"
     db_name: str = "tangerine_photo"
+    # Full SQLAlchemy URL; overrides the DB_* fields when set
+    # (e.g. sqlite:///bench.db for benchmarks)
+    db_url: str = ""
 
     secret_key: str = "tangerine-photo-secret-key-change-in-production"
     admin_username: str = "admin"
@@ -32,7 +35,50 @@ class Settings(BaseSettings):
     host: str = "0.0.0.0"
     port: int = 8090
 
+    # Run migrate.py (create tables + seed) from the app's lifespan on boot.
+    # Production: set false and run `python migrate.py` once per deploy.
+    auto_migrate: bool = True
+
     access_token_expire_minutes: int = 60 * 24  # 24 hours
+    token_cache_ttl_seconds: int = 60  # re-verify cached JWTs (and revocations) at least this often
+    token_cache_max_entries: int = 1024
+
+    # Static JSON snapshots of the public read endpoints (served from the CDN)
+    snapshot_enabled: bool = False
+    snapshot_prefix: str = "snapshot"
+    snapshot_page_size: int = 20
+    snapshot_brotli: bool = False  # also upload <name>.br (needs `pip install brotli`)
+    snapshot_debounce_seconds: float = 2.0  # merge refreshes queued within this window
+
+    # ZIP archive downloads: objects fetched ahead of the writer (= photos in memory)
+    archive_prefetch: int = 4
+
+    # Moving objects after a category rename / photo move
+    relocate_batch_size: int = 100
+    relocate_workers: int = 8
+
+    # Deep Zoom tile pyramids for very large photos (panoramas)
+    tiles_enabled: bool = True
+    tiles_min_megapixels: float = 50.0
+    tiles_size: int = 254
+    tiles_overlap: int = 1
+    tiles_quality: int = 85
+    tiles_workers: int = 0  # encoder processes, shared by all jobs; 0 = one per CPU
+    tiles_max_jobs: int = 1  # pyramids rendered at once (each holds a decoded source)
+    tiles_upload_workers: int = 16
+
+    # Public counter endpoints (view / download / site view) abuse protection
+    rate_limit_enabled: bool = True
+    rate_limit_backend: str = "memory"  # "memory" (per worker) or "redis" (shared)
+    rate_limit_redis_url: str = "redis://localhost:6379/0"
+    rate_limit_trust_proxy: bool = True  # take client IP from Nginx's X-Real-IP...
+    rate_limit_trusted_proxies: str = "127.0.0.1,::1"  # ...only when the peer is one of these (IPs / CIDRs)
+    rate_limit_ip_rate: float = 2.0  # tokens per second, per client IP
+    rate_limit_ip_burst: int = 30
+    rate_limit_photo_rate: float = 20.0  # tokens per second, per photo
+    rate_limit_photo_burst: int = 100
+    rate_limit_dedupe_seconds: int = 30 * 60  # count a client once per window
+    rate_limit_max_keys: int = 100_000
 
     @property
     def public_url(self) -> str:
@@ -47,6 +93,8 @@ class Settings(BaseSettings):
 
     @property
     def database_url(self) -> str:
+        if self.db_url:
+            return self.db_url
         return (
             f"mysql+pymysql://{self.db_user}:{self.db_password}"
             f"@{self.db_host}:{self.db_port}/{self.db_name}"
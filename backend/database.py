@@ -1,9 +1,12 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, insert
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 
 from config import settings
 
-engine = create_engine(settings.database_url, pool_pre_ping=True)
+_connect_args = (
+    {"check_same_thread": False} if settings.database_url.startswith("sqlite") else {}
+)
+engine = create_engine(settings.database_url, pool_pre_ping=True, connect_args=_connect_args)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
@@ -11,6 +14,14 @@ class Base(DeclarativeBase):
     pass
 
 
+def insert_ignore(db, model, rows: list) -> None:
+    """One multi-row INSERT that skips rows whose primary/unique key exists."""
+    if not rows:
+        return
+    prefix = "OR IGNORE" if db.bind.dialect.name == "sqlite" else "IGNORE"
+    db.execute(insert(model).prefix_with(prefix), rows)
+
+
 def get_db():
     db = SessionLocal()
     try:
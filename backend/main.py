@@ -1,25 +1,63 @@
 import uuid
+from contextlib import asynccontextmanager
 from typing import Optional, List
 
 from fastapi import (
     FastAPI, UploadFile, File, Form, Depends, HTTPException, status, Query,
+    BackgroundTasks,
 )
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
-from pydantic import BaseModel
 from sqlalchemy.orm import Session
 from sqlalchemy import func as sa_func
 
 from config import settings
-from database import engine, get_db, Base
+from database import get_db
 from models import Photo, Category, SiteSettings, SiteStats
-from storage import get_storage_client
-from auth import authenticate_user, create_access_token, get_current_user, Token
+from storage import LazyStorageClient
+from ratelimit import RateLimitMiddleware
+import archive
+import blobs
+import changes
+import migrate
+import relocate
+import snapshot
+import tiles
+from auth import (
+    authenticate_user, create_access_token, get_current_user, revoke_token,
+    oauth2_scheme, Token,
+)
+from schemas import (
+    PhotoOut, PaginatedPhotos, PhotoArchiveRequest, CategoryOut, CategoryCreate, CategoryUpdate,
+    CategoryReorder, SiteSettingsOut, PhotoChangeOut, CategoryChangeOut, ChangeOut,
+    ChangeFeed,
+)
 
 # ---------------------------------------------------------------------------
 # App
 # ---------------------------------------------------------------------------
-app = FastAPI(title="Tangerine Photo API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Schema + seed data belong to `python migrate.py`; AUTO_MIGRATE keeps the
+    # zero-setup dev workflow. A DB that is briefly down must not stop the
+    # worker from booting — requests reconnect via pool_pre_ping.
+    if settings.auto_migrate:
+        try:
+            await run_in_threadpool(migrate.run)
+        except Exception as e:
+            print(f"Auto-migrate warning: {e}")
+    yield
+    tiles.shutdown()
+
+
+app = FastAPI(title="Tangerine Photo API", lifespan=lifespan)
+
+# Token buckets + de-dupe in front of the unauthenticated counter endpoints.
+# Added first so CORSMiddleware wraps it and 429s still carry CORS headers.
+if settings.rate_limit_enabled:
+    app.add_middleware(RateLimitMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -29,39 +67,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize storage (MinIO or Tencent COS, depending on STORAGE_BACKEND)
-storage = get_storage_client()
-
-# Create tables
-Base.metadata.create_all(bind=engine)
-
-# Seed default categories + settings on first run
-def _seed(db: Session):
-    if db.query(Category).count() == 0:
-        for i, name in enumerate(["landscape", "portrait", "street"]):
-            db.add(Category(name=name, display_name=name.title(), sort_order=i))
-        db.commit()
-    defaults = {
-        "site_title": "TANGERINE",
-        "site_subtitle": "",
-        "contact_email": "",
-        "weibo_url": "",
-        "wechat_id": "",
-        "xiaohongshu_url": "",
-        "bilibili_url": "",
-        "douyin_url": "",
-        "footer_text": "",
-        "about_photo_url": "",
-        "about_bio_en": "",
-        "about_bio_zh": "",
-    }
-    for k, v in defaults.items():
-        if not db.query(SiteSettings).filter_by(key=k).first():
-            db.add(SiteSettings(key=k, value=v))
-    db.commit()
-
-with next(get_db()) as db:
-    _seed(db)
+# Storage (MinIO or Tencent COS, depending on STORAGE_BACKEND). The SDK is
+# only imported and the client built on first use, not at import time.
+storage = LazyStorageClient()
 
 
 # ---------------------------------------------------------------------------
@@ -75,6 +83,7 @@ def _extract_exif(file_data: bytes) -> dict:
         from PIL.ExifTags import TAGS, IFD
         from io import BytesIO
 
+        # Panoramas past Pillow's pixel limit open too: see tiles.py
         img = Image.open(BytesIO(file_data))
         result["width"] = img.width
         result["height"] = img.height
@@ -121,76 +130,6 @@ def _extract_exif(file_data: bytes) -> dict:
     return result
 
 
-# ---------------------------------------------------------------------------
-# Schemas
-# ---------------------------------------------------------------------------
-class PhotoOut(BaseModel):
-    id: str
-    filename: str
-    url: str
-    category: str
-    title: Optional[str] = None
-    description: Optional[str] = None
-    width: Optional[int] = None
-    height: Optional[int] = None
-    sort_order: int = 0
-    view_count: int = 0
-    download_count: int = 0
-    camera_make: Optional[str] = None
-    camera_model: Optional[str] = None
-    iso: Optional[int] = None
-    aperture: Optional[float] = None
-    shutter_speed: Optional[str] = None
-    focal_length: Optional[float] = None
-
-    class Config:
-        from_attributes = True
-
-
-class PaginatedPhotos(BaseModel):
-    items: List[PhotoOut]
-    total: int
-
-
-class CategoryOut(BaseModel):
-    id: str
-    name: str
-    display_name: Optional[str] = None
-    sort_order: int = 0
-
-    class Config:
-        from_attributes = True
-
-
-class CategoryCreate(BaseModel):
-    name: str
-    display_name: Optional[str] = None
-
-
-class CategoryUpdate(BaseModel):
-    name: Optional[str] = None
-    display_name: Optional[str] = None
-
-
-class CategoryReorder(BaseModel):
-    ids: List[str]  # ordered list of category IDs
-
-
-class SiteSettingsOut(BaseModel):
-    site_title: str = "TANGERINE"
-    site_subtitle: str = ""
-    contact_email: str = ""
-    weibo_url: str = ""
-    wechat_id: str = ""
-    xiaohongshu_url: str = ""
-    bilibili_url: str = ""
-    douyin_url: str = ""
-    footer_text: str = ""
-    about_photo_url: str = ""
-    about_bio_en: str = ""
-    about_bio_zh: str = ""
-
-
 # ---------------------------------------------------------------------------
 # Auth
 # ---------------------------------------------------------------------------
@@ -206,6 +145,15 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
     return {"access_token": access_token, "token_type": "bearer"}
 
 
+@app.post("/api/auth/logout")
+def logout(
+    token: str = Depends(oauth2_scheme),
+    _user: str = Depends(get_current_user),
+):
+    revoke_token(token)
+    return {"message": "logged out"}
+
+
 # ---------------------------------------------------------------------------
 # Public: Photos
 # ---------------------------------------------------------------------------
@@ -247,6 +195,7 @@ def get_settings(db: Session = Depends(get_db)):
 # ---------------------------------------------------------------------------
 @app.post("/api/photos", response_model=PhotoOut)
 async def upload_photo(
+    background: BackgroundTasks,
     file: UploadFile = File(...),
     category: str = Form(default="uncategorized"),
     title: Optional[str] = Form(default=None),
@@ -257,55 +206,72 @@ async def upload_photo(
 ):
     ext = file.filename.rsplit(".", 1)[-1] if "." in file.filename else "jpg"
     photo_id = str(uuid.uuid4())
-    object_key = f"{category}/{photo_id}.{ext}"
 
-    file_data = await file.read()
+    file_data, sha256 = await blobs.read_and_hash(file)
     file_size = len(file_data)
 
-    # Extract EXIF metadata
-    exif = _extract_exif(file_data)
-
-    storage.put_object(object_key, file_data, file.content_type or "image/jpeg")
-
-    url = f"{settings.public_url}/{object_key}"
-
-    # Ensure category exists
-    cat_row = db.query(Category).filter_by(name=category).first()
-    if not cat_row:
-        cat_row = Category(name=category, display_name=category.title())
-        db.add(cat_row)
-        db.flush()
-
-    photo = Photo(
-        id=photo_id,
-        filename=f"{photo_id}.{ext}",
-        original_filename=file.filename,
-        object_key=object_key,
-        url=url,
-        category=category,
-        title=title,
-        description=description,
-        sort_order=sort_order,
-        file_size=file_size,
-        content_type=file.content_type,
-        width=exif.get("width"),
-        height=exif.get("height"),
-        camera_make=exif.get("camera_make"),
-        camera_model=exif.get("camera_model"),
-        iso=exif.get("iso"),
-        aperture=exif.get("aperture"),
-        shutter_speed=exif.get("shutter_speed"),
-        focal_length=exif.get("focal_length"),
+    # Identical bytes already stored: reuse the object (no PUT) and its EXIF
+    object_key, deduplicated = blobs.acquire(
+        db, storage, sha256, file_data, ext, file.content_type or "image/jpeg",
     )
-    db.add(photo)
-    db.commit()
+    try:
+        exif = (deduplicated and blobs.sibling_exif(db, sha256)) or _extract_exif(file_data)
+
+        url = f"{settings.public_url}/{object_key}"
+
+        # Ensure category exists
+        cat_row = db.query(Category).filter_by(name=category).first()
+        created_category = cat_row is None
+        if not cat_row:
+            cat_row = Category(name=category, display_name=category.title())
+            db.add(cat_row)
+            db.flush()
+
+        photo = Photo(
+            id=photo_id,
+            filename=f"{photo_id}.{ext}",
+            original_filename=file.filename,
+            object_key=object_key,
+            blob_sha256=sha256,
+            url=url,
+            category=category,
+            title=title,
+            description=description,
+            sort_order=sort_order,
+            file_size=file_size,
+            content_type=file.content_type,
+            width=exif.get("width"),
+            height=exif.get("height"),
+            camera_make=exif.get("camera_make"),
+            camera_model=exif.get("camera_model"),
+            iso=exif.get("iso"),
+            aperture=exif.get("aperture"),
+            shutter_speed=exif.get("shutter_speed"),
+            focal_length=exif.get("focal_length"),
+        )
+        db.add(photo)
+        changes.record(db, changes.PHOTO, [photo_id])
+        if created_category:
+            changes.record(db, changes.CATEGORY, [cat_row.id])
+        db.commit()
+    except Exception:
+        db.rollback()
+        if not deduplicated:
+            blobs.discard(storage, object_key)  # nothing will ever reference it
+        raise
     db.refresh(photo)
+    background.add_task(
+        snapshot.refresh, storage, photo_categories=[category], categories=created_category,
+    )
+    if tiles.needs_tiles(photo.width, photo.height):
+        tiles.schedule(storage, photo.id)
     return photo
 
 
 @app.put("/api/photos/{photo_id}")
 def update_photo(
     photo_id: str,
+    background: BackgroundTasks,
     title: Optional[str] = Form(default=None),
     description: Optional[str] = Form(default=None),
     category: Optional[str] = Form(default=None),
@@ -317,6 +283,7 @@ def update_photo(
     photo = db.query(Photo).filter_by(id=photo_id).first()
     if not photo:
         raise HTTPException(status_code=404, detail="Photo not found")
+    old_category = photo.category
     if title is not None:
         photo.title = title
     if description is not None:
@@ -327,14 +294,21 @@ def update_photo(
         photo.sort_order = sort_order
     if is_visible is not None:
         photo.is_visible = is_visible
+    changes.record(db, changes.PHOTO, [photo.id])
     db.commit()
     db.refresh(photo)
+    background.add_task(
+        snapshot.refresh, storage, photo_categories=[old_category, photo.category],
+    )
+    if photo.category != old_category:
+        background.add_task(relocate.relocate_objects, storage, photo.category)
     return {"id": photo.id, "message": "updated"}
 
 
 @app.delete("/api/photos/{photo_id}")
 def delete_photo(
     photo_id: str,
+    background: BackgroundTasks,
     _user: str = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
@@ -342,23 +316,83 @@ def delete_photo(
     if not photo:
         raise HTTPException(status_code=404, detail="Photo not found")
 
-    # Remove from storage
-    try:
-        storage.delete_object(photo.object_key)
-    except Exception:
-        pass
+    # Shared objects go only with their last reference, after the commit
+    if photo.blob_sha256:
+        orphan_key = blobs.release(db, photo.blob_sha256)
+    else:
+        orphan_key = photo.object_key
+    pyramid = photo.dzi_url and (tiles.tiles_prefix(photo), photo.width, photo.height)
 
     db.delete(photo)
+    changes.record(db, changes.PHOTO, [photo.id], changes.DELETE)
     db.commit()
+
+    if orphan_key:
+        try:
+            storage.delete_object(orphan_key)
+        except Exception:
+            pass
+        if pyramid:
+            background.add_task(tiles.delete_pyramid, storage, *pyramid)
+    background.add_task(snapshot.refresh, storage, photo_categories=[photo.category])
     return {"message": "deleted"}
 
 
+# ---------------------------------------------------------------------------
+# Admin: ZIP archives
+# ---------------------------------------------------------------------------
+def _archive_response(db: Session, photos: List[Photo], name: str) -> StreamingResponse:
+    if not photos:
+        raise HTTPException(status_code=404, detail="No photos to archive")
+    entries = archive.archive_entries(photos)
+    # Count the downloads in one statement, before streaming starts
+    db.query(Photo).filter(Photo.id.in_([p.id for p in photos])).update(
+        {Photo.download_count: Photo.download_count + 1}, synchronize_session=False,
+    )
+    db.commit()
+    return StreamingResponse(
+        archive.stream_zip(storage, entries),
+        media_type="application/zip",
+        headers={"Content-Disposition": archive.content_disposition(name)},
+    )
+
+
+@app.get("/api/categories/{category_id}/archive")
+def archive_category(
+    category_id: str,
+    _user: str = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    cat = db.query(Category).filter_by(id=category_id).first()
+    if not cat:
+        raise HTTPException(status_code=404, detail="Category not found")
+    photos = (
+        db.query(Photo)
+        .filter(Photo.category == cat.name)
+        .order_by(Photo.sort_order.asc(), Photo.created_at.desc())
+        .all()
+    )
+    return _archive_response(db, photos, cat.name)
+
+
+@app.post("/api/photos/archive")
+def archive_photos(
+    body: PhotoArchiveRequest,
+    _user: str = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    by_id = {p.id: p for p in db.query(Photo).filter(Photo.id.in_(body.ids)).all()}
+    photos = [by_id[i] for i in dict.fromkeys(body.ids) if i in by_id]
+    return _archive_response(db, photos, "photos")
+
+
 # ---------------------------------------------------------------------------
 # Admin: Categories
 # ---------------------------------------------------------------------------
 @app.post("/api/categories", response_model=CategoryOut)
 def create_category(
     body: CategoryCreate,
+    background: BackgroundTasks,
     _user: str = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
@@ -370,14 +404,18 @@ def create_category(
         display_name=body.display_name or body.name.title(),
     )
     db.add(cat)
+    db.flush()
+    changes.record(db, changes.CATEGORY, [cat.id])
     db.commit()
     db.refresh(cat)
+    background.add_task(snapshot.refresh, storage, categories=True)
     return cat
 
 
 @app.delete("/api/categories/{category_id}")
 def delete_category(
     category_id: str,
+    background: BackgroundTasks,
     _user: str = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
@@ -385,21 +423,28 @@ def delete_category(
     if not cat:
         raise HTTPException(status_code=404, detail="Category not found")
     db.delete(cat)
+    changes.record(db, changes.CATEGORY, [cat.id], changes.DELETE)
     db.commit()
+    background.add_task(snapshot.refresh, storage, categories=True)
     return {"message": "deleted"}
 
 
 @app.put("/api/categories/reorder")
 def reorder_categories(
     body: CategoryReorder,
+    background: BackgroundTasks,
     _user: str = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
+    reordered = []
     for index, cat_id in enumerate(body.ids):
         cat = db.query(Category).filter_by(id=cat_id).first()
         if cat:
             cat.sort_order = index
+            reordered.append(cat.id)
+    changes.record(db, changes.CATEGORY, reordered)
     db.commit()
+    background.add_task(snapshot.refresh, storage, categories=True)
     return {"message": "reordered"}
 
 
@@ -407,24 +452,34 @@ def reorder_categories(
 def update_category(
     category_id: str,
     body: CategoryUpdate,
+    background: BackgroundTasks,
     _user: str = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     cat = db.query(Category).filter_by(id=category_id).first()
     if not cat:
         raise HTTPException(status_code=404, detail="Category not found")
-    if body.name is not None:
+    old_name = cat.name
+    if body.name is not None and body.name != old_name:
         # Check unique
         existing = db.query(Category).filter(
             Category.name == body.name, Category.id != category_id
         ).first()
         if existing:
             raise HTTPException(status_code=400, detail="Category name already exists")
-        cat.name = body.name
+        # Photos follow in the same transaction; objects move in the background
+        relocate.rename_category(db, cat, body.name)
     if body.display_name is not None:
         cat.display_name = body.display_name
+    changes.record(db, changes.CATEGORY, [cat.id])
     db.commit()
     db.refresh(cat)
+    background.add_task(snapshot.refresh, storage, categories=True)
+    if cat.name != old_name:
+        background.add_task(
+            snapshot.refresh, storage, photo_categories=[old_name, cat.name],
+        )
+        background.add_task(relocate.relocate_objects, storage, cat.name)
     return cat
 
 
@@ -434,6 +489,7 @@ def update_category(
 @app.put("/api/settings")
 def update_settings(
     settings_data: dict,
+    background: BackgroundTasks,
     _user: str = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
@@ -444,11 +500,13 @@ def update_settings(
         else:
             db.add(SiteSettings(key=key, value=str(value)))
     db.commit()
+    background.add_task(snapshot.refresh, storage, site_settings=True)
     return {"message": "updated"}
 
 
 @app.post("/api/settings/about-photo")
 async def upload_about_photo(
+    background: BackgroundTasks,
     file: UploadFile = File(...),
     _user: str = Depends(get_current_user),
     db: Session = Depends(get_db),
@@ -469,10 +527,74 @@ async def upload_about_photo(
     else:
         db.add(SiteSettings(key="about_photo_url", value=url))
     db.commit()
+    background.add_task(snapshot.refresh, storage, site_settings=True)
 
     return {"url": url}
 
 
+@app.post("/api/snapshot/rebuild")
+def rebuild_snapshot(
+    background: BackgroundTasks,
+    _user: str = Depends(get_current_user),
+):
+    """Re-export every static snapshot file (e.g. after enabling snapshots)."""
+    if not settings.snapshot_enabled:
+        raise HTTPException(status_code=400, detail="Snapshots are disabled")
+
+    background.add_task(snapshot.export_all, storage)
+    return {"message": "scheduled", "index_url": snapshot.snapshot_url("index.json")}
+
+
+# ---------------------------------------------------------------------------
+# Admin: Change feed
+# ---------------------------------------------------------------------------
+@app.get("/api/changes", response_model=ChangeFeed)
+def list_changes(
+    since: str = "0",
+    limit: int = Query(default=500, ge=1, le=5000),
+    _user: str = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Photos / categories changed after ``since`` (0 = everything)."""
+    try:
+        token = int(since)
+    except ValueError:
+        token = -1
+    if token < 0:
+        raise HTTPException(status_code=400, detail="Invalid since token")
+    entries = changes.since(db, token, limit)
+
+    # Current rows for the upserts, one query per entity type
+    wanted = {changes.PHOTO: [], changes.CATEGORY: []}
+    for e in entries:
+        if e.op == changes.UPSERT:
+            wanted[e.entity_type].append(e.entity_id)
+    photos = {
+        p.id: p for p in db.query(Photo).filter(Photo.id.in_(wanted[changes.PHOTO])).all()
+    } if wanted[changes.PHOTO] else {}
+    cats = {
+        c.id: c for c in db.query(Category).filter(Category.id.in_(wanted[changes.CATEGORY])).all()
+    } if wanted[changes.CATEGORY] else {}
+
+    out = []
+    for e in entries:
+        if e.entity_type == changes.PHOTO:
+            row, schema = photos.get(e.entity_id), PhotoChangeOut
+        else:
+            row, schema = cats.get(e.entity_id), CategoryChangeOut
+        if e.op == changes.UPSERT and row is not None:
+            out.append(ChangeOut(
+                type=e.entity_type, id=e.entity_id, op=changes.UPSERT,
+                data=schema.model_validate(row),
+            ))
+        else:
+            # Tombstone, or the row vanished after being logged
+            out.append(ChangeOut(type=e.entity_type, id=e.entity_id, op=changes.DELETE))
+
+    next_token = str(entries[-1].seq) if entries else str(token)
+    return ChangeFeed(changes=out, next=next_token, has_more=len(entries) == limit)
+
+
 # ---------------------------------------------------------------------------
 # Public: View / download tracking
 # ---------------------------------------------------------------------------
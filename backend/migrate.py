@@ -0,0 +1,81 @@
+"""
+Create tables, add newly introduced columns and seed defaults.
+
+Run once per deploy (``python migrate.py``) instead of on every worker boot.
+With ``AUTO_MIGRATE=true`` (the default, handy for local dev) the API also
+runs it from its lifespan hook; both paths are idempotent.
+"""
+
+from sqlalchemy import inspect, text
+from sqlalchemy.orm import Session
+
+from database import engine, SessionLocal, Base, insert_ignore
+from models import Category, SiteSettings
+import changes
+
+DEFAULT_CATEGORIES = ["landscape", "portrait", "street"]
+
+DEFAULT_SETTINGS = {
+    "site_title": "TANGERINE",
+    "site_subtitle": "",
+    "contact_email": "",
+    "weibo_url": "",
+    "wechat_id": "",
+    "xiaohongshu_url": "",
+    "bilibili_url": "",
+    "douyin_url": "",
+    "footer_text": "",
+    "about_photo_url": "",
+    "about_bio_en": "",
+    "about_bio_zh": "",
+}
+
+
+def seed(db: Session) -> None:
+    if db.query(Category.id).first() is None:
+        db.add_all([
+            Category(name=name, display_name=name.title(), sort_order=i)
+            for i, name in enumerate(DEFAULT_CATEGORIES)
+        ])
+    insert_ignore(
+        db, SiteSettings, [{"key": k, "value": v} for k, v in DEFAULT_SETTINGS.items()],
+    )
+    db.commit()
+
+
+def add_missing_columns() -> None:
+    """Add columns that newer models introduced to tables that already exist.
+
+    ``create_all`` only creates missing tables.  New columns are added as
+    nullable with no backfill, along with any index on them.
+    """
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            added = set()
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                col_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type} NULL"))
+                added.add(column.name)
+            for index in table.indexes:
+                if added & {c.name for c in index.columns}:
+                    index.create(conn)
+
+
+def run() -> None:
+    Base.metadata.create_all(bind=engine)
+    add_missing_columns()
+    with SessionLocal() as db:
+        seed(db)
+        changes.backfill(db)
+        db.commit()
+
+
+if __name__ == "__main__":
+    run()
+    print("Migrations applied")
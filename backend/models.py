@@ -1,7 +1,9 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import Column, String, Text, DateTime, Integer, Boolean, Float
+from sqlalchemy import (
+    Column, String, Text, DateTime, Integer, BigInteger, Boolean, Float, Index,
+)
 from sqlalchemy.sql import func
 
 from database import Base
@@ -18,6 +20,10 @@ class Photo(Base):
     filename = Column(String(255), nullable=False)
     original_filename = Column(String(255), nullable=False)
     object_key = Column(String(512), nullable=False, comment="COS object key")
+    blob_sha256 = Column(
+        String(64), nullable=True, index=True,
+        comment="Content hash of the shared object (blobs.sha256); NULL = legacy per-photo key",
+    )
     url = Column(String(1024), nullable=False)
     category = Column(String(100), nullable=False, default="uncategorized", index=True)
     title = Column(String(255), nullable=True)
@@ -28,6 +34,7 @@ class Photo(Base):
     height = Column(Integer, nullable=True)
     file_size = Column(Integer, nullable=True, comment="File size in bytes")
     content_type = Column(String(100), nullable=True)
+    dzi_url = Column(String(1024), nullable=True, comment="Deep Zoom manifest for very large photos")
 
     # View / download counters
     view_count = Column(Integer, default=0, nullable=False)
@@ -45,6 +52,19 @@ class Photo(Base):
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
 
+class Blob(Base):
+    """One stored object, shared by every photo with identical bytes."""
+
+    __tablename__ = "blobs"
+
+    sha256 = Column(String(64), primary_key=True)
+    object_key = Column(String(512), nullable=False)
+    size = Column(Integer, nullable=False)
+    content_type = Column(String(100), nullable=True)
+    ref_count = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, server_default=func.now())
+
+
 class Category(Base):
     __tablename__ = "categories"
 
@@ -54,6 +74,7 @@ class Category(Base):
     sort_order = Column(Integer, default=0)
     is_visible = Column(Boolean, default=True)
     created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
 
 class SiteSettings(Base):
@@ -70,3 +91,34 @@ class SiteStats(Base):
     key = Column(String(100), primary_key=True)
     value = Column(Integer, default=0, nullable=False)
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+
+class RevokedToken(Base):
+    """Logged-out JWTs, shared by every worker until they would have expired."""
+
+    __tablename__ = "revoked_tokens"
+
+    token_sha256 = Column(String(64), primary_key=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+
+class Change(Base):
+    """Compacted change log: at most one row per entity, its latest change.
+
+    ``seq`` is the monotonic sync token handed to clients; ``changes.py``
+    allocates it from a counter so a value is never reused.
+    """
+
+    __tablename__ = "changes"
+    __table_args__ = (
+        Index("ix_changes_entity", "entity_type", "entity_id"),
+        {"sqlite_autoincrement": True},
+    )
+
+    seq = Column(
+        BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True,
+    )
+    entity_type = Column(String(20), nullable=False, comment="photo | category")
+    entity_id = Column(String(36), nullable=False)
+    op = Column(String(10), nullable=False, comment="upsert | delete (tombstone)")
+    changed_at = Column(DateTime, server_default=func.now())
@@ -0,0 +1,215 @@
+"""
+Rate limiting and de-duplication for the public counter endpoints.
+
+State lives in a ``RateLimitBackend``: in-process LRU, or Redis when ``RATE_LIMIT_BACKEND=redis``.
+"""
+
+from __future__ import annotations
+
+import ipaddress
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Optional, Protocol
+
+from config import settings
+
+
+# ---------------------------------------------------------------------------
+# Backends
+# ---------------------------------------------------------------------------
+class RateLimitBackend(Protocol):
+    def take(self, key: str, rate: float, burst: int) -> bool:
+        """Consume one token from bucket ``key``; False when it is empty."""
+        ...
+
+    def seen(self, key: str, window: float) -> bool:
+        """Return True if ``key`` was marked within ``window`` seconds, else mark it."""
+        ...
+
+    def forget(self, key: str) -> None:
+        """Drop the mark ``seen`` set for ``key``."""
+        ...
+
+
+class LocalRateLimitBackend:
+    """In-process token buckets and de-dupe marks in one LRU-bounded dict."""
+
+    def __init__(self, max_keys: int = 100_000, clock=time.monotonic):
+        self._entries: OrderedDict[str, tuple] = OrderedDict()
+        self._max_keys = max_keys
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _store(self, key: str, value: tuple) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_keys:
+            self._entries.popitem(last=False)
+
+    def take(self, key: str, rate: float, burst: int) -> bool:
+        now = self._clock()
+        with self._lock:
+            tokens, last = self._entries.get(key, (float(burst), now))
+            tokens = min(float(burst), tokens + (now - last) * rate)
+            allowed = tokens >= 1.0
+            if allowed:
+                tokens -= 1.0
+            self._store(key, (tokens, now))
+        return allowed
+
+    def seen(self, key: str, window: float) -> bool:
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                return True
+            self._store(key, (now + window,))
+        return False
+
+    def forget(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+# Refill and take atomically on the Redis side; returns 1 if allowed.
+_REDIS_TAKE = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 't', 'ts')
+local tokens = tonumber(state[1]) or burst
+local last = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + (now - last) * rate)
+local allowed = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+  allowed = 1
+end
+redis.call('HSET', KEYS[1], 't', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return allowed
+"""
+
+
+class RedisRateLimitBackend:
+    """Shared buckets for multi-worker deployments (needs ``pip install redis``)."""
+
+    def __init__(self, url: str):
+        import redis
+
+        self._client = redis.Redis.from_url(url)
+        self._take = self._client.register_script(_REDIS_TAKE)
+
+    def take(self, key: str, rate: float, burst: int) -> bool:
+        return bool(self._take(keys=[f"rl:{key}"], args=[rate, burst, time.time()]))
+
+    def seen(self, key: str, window: float) -> bool:
+        # SET NX succeeds only for the first request inside the window
+        return not self._client.set(f"rl:{key}", 1, nx=True, ex=max(1, int(window)))
+
+    def forget(self, key: str) -> None:
+        self._client.delete(f"rl:{key}")
+
+
+def get_rate_limit_backend() -> RateLimitBackend:
+    """Return the backend configured by RATE_LIMIT_BACKEND."""
+    backend = settings.rate_limit_backend.lower()
+    if backend == "memory":
+        return LocalRateLimitBackend(max_keys=settings.rate_limit_max_keys)
+    if backend == "redis":
+        return RedisRateLimitBackend(settings.rate_limit_redis_url)
+    raise ValueError(f"Unknown RATE_LIMIT_BACKEND: {backend!r}  (use 'memory' or 'redis')")
+
+
+# ---------------------------------------------------------------------------
+# Middleware
+# ---------------------------------------------------------------------------
+_PHOTO_COUNTER = re.compile(r"^/api/photos/([^/]+)/(view|download)$")
+_SITE_VIEW = "/api/site/view"
+
+
+def _match(path: str) -> Optional[tuple]:
+    """Return ``(counter, photo_id)`` for a counter endpoint, else None."""
+    if path == _SITE_VIEW:
+        return "site", ""
+    m = _PHOTO_COUNTER.match(path)
+    if m:
+        return m.group(2), m.group(1)
+    return None
+
+
+@lru_cache(maxsize=4)
+def _proxy_networks(spec: str) -> tuple:
+    return tuple(ipaddress.ip_network(p.strip(), strict=False) for p in spec.split(",") if p.strip())
+
+
+def _is_trusted_proxy(peer: str) -> bool:
+    try:
+        addr = ipaddress.ip_address(peer)
+    except ValueError:
+        return False
+    return any(addr in net for net in _proxy_networks(settings.rate_limit_trusted_proxies))
+
+
+def _client_ip(scope) -> str:
+    client = scope.get("client")
+    peer = client[0] if client else "unknown"
+    # Nginx sets X-Real-IP (see DEPLOYMENT.md).  Anyone can send the header,
+    # so only believe it when the connection itself comes from the proxy.
+    if settings.rate_limit_trust_proxy and _is_trusted_proxy(peer):
+        for name, value in scope.get("headers", ()):
+            if name == b"x-real-ip":
+                return value.decode("latin-1").strip()
+    return peer
+
+
+class RateLimitMiddleware:
+    """Pure ASGI middleware: client bucket, de-dupe, then photo bucket; other requests pass through."""
+
+    def __init__(self, app, backend: Optional[RateLimitBackend] = None):
+        self.app = app
+        self.backend = backend or get_rate_limit_backend()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST":
+            return await self.app(scope, receive, send)
+        matched = _match(scope["path"])
+        if matched is None:
+            return await self.app(scope, receive, send)
+
+        counter, photo_id = matched
+        ip = _client_ip(scope)
+        backend = self.backend
+
+        if not backend.take(f"ip:{ip}", settings.rate_limit_ip_rate, settings.rate_limit_ip_burst):
+            return await _respond(send, 429, {"detail": "Too many requests"}, retry_after=True)
+        seen_key = f"seen:{counter}:{ip}:{photo_id}"
+        if backend.seen(seen_key, settings.rate_limit_dedupe_seconds):
+            return await _respond(send, 200, {"deduplicated": True})
+        if photo_id and not backend.take(
+            f"photo:{photo_id}", settings.rate_limit_photo_rate, settings.rate_limit_photo_burst,
+        ):
+            # Not counted, so the client's retry must not look like a repeat
+            backend.forget(seen_key)
+            return await _respond(send, 429, {"detail": "Too many requests"}, retry_after=True)
+        return await self.app(scope, receive, send)
+
+
+async def _respond(send, status_code: int, payload: dict, retry_after: bool = False) -> None:
+    body = json.dumps(payload).encode("utf-8")
+    headers = [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(body)).encode("ascii")),
+    ]
+    if retry_after:
+        headers.append((b"retry-after", b"1"))
+    await send({"type": "http.response.start", "status": status_code, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,119 @@
+"""
+Category changes: rename a category, and move objects to match.
+
+``relocate_objects`` moves legacy ``<category>/...`` objects in the background;
+it is resumable, just run ``python relocate.py [category]`` again.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from config import settings
+from database import SessionLocal
+from models import Photo, Category
+from storage import StorageClient
+import changes
+import snapshot
+
+
+def rename_category(db: Session, cat: Category, new_name: str) -> str:
+    """Rename ``cat`` and re-point its photos in one set-based UPDATE.
+
+    Does not commit; returns the old name.  Objects are moved afterwards by
+    ``relocate_objects``.
+    """
+    old_name = cat.name
+    cat.name = new_name
+    db.query(Photo).filter(Photo.category == old_name).update(
+        {Photo.category: new_name}, synchronize_session=False,
+    )
+    changes.record_photos_where(db, Photo.category == new_name)
+    return old_name
+
+
+def _misplaced(db: Session, category: Optional[str], limit: int):
+    q = db.query(Photo.id, Photo.object_key, Photo.category, Photo.filename).filter(
+        Photo.blob_sha256.is_(None),
+        Photo.object_key != Photo.category + "/" + Photo.filename,
+    )
+    if category is not None:
+        q = q.filter(Photo.category == category)
+    return q.order_by(Photo.id).limit(limit).all()
+
+
+def _copy(storage: StorageClient, move: tuple) -> Optional[tuple]:
+    _, old_key, new_key = move
+    try:
+        storage.copy_object(old_key, new_key)
+        return move
+    except Exception as e:
+        print(f"Relocate warning: {old_key} -> {new_key}: {e}")
+        return None
+
+
+def _delete(storage: StorageClient, key: str) -> None:
+    try:
+        storage.delete_object(key)
+    except Exception:
+        pass
+
+
+def relocate_objects(storage: StorageClient, category: Optional[str] = None) -> int:
+    """Move every misplaced object (optionally only in ``category``). Returns the count."""
+    moved = 0
+    failed: set = set()
+    touched: set = set()
+    batch_size = settings.relocate_batch_size
+    with SessionLocal() as db, ThreadPoolExecutor(max_workers=settings.relocate_workers) as pool:
+        while True:
+            rows = [
+                r for r in _misplaced(db, category, batch_size + len(failed))
+                if r.id not in failed
+            ][:batch_size]
+            if not rows:
+                break
+            moves = [(r.id, r.object_key, f"{r.category}/{r.filename}") for r in rows]
+            done = [m for m in pool.map(lambda m: _copy(storage, m), moves) if m]
+            failed.update(m[0] for m in moves if m not in done)
+
+            switched, stale = [], []
+            for move in done:
+                photo_id, old_key, new_key = move
+                # Compare-and-set, so a concurrent run can't switch a row twice
+                count = db.query(Photo).filter(
+                    Photo.id == photo_id, Photo.object_key == old_key,
+                ).update(
+                    {Photo.object_key: new_key, Photo.url: f"{settings.public_url}/{new_key}"},
+                    synchronize_session=False,
+                )
+                (switched if count else stale).append(move)
+            # A concurrent run may have switched a stale row to this very key
+            live = {key for (key,) in db.query(Photo.object_key).filter(
+                Photo.object_key.in_([m[2] for m in stale]),
+            )} if stale else set()
+            changes.record(db, changes.PHOTO, [m[0] for m in switched])
+            db.commit()
+            garbage = [m[1] for m in switched] + [m[2] for m in stale if m[2] not in live]
+            list(pool.map(lambda key: _delete(storage, key), garbage))
+            moved += len(switched)
+            touched.update(r.category for r in rows)
+            print(f"Relocated {moved} object(s)")
+
+    if touched:
+        snapshot.refresh(storage, photo_categories=touched)
+    return moved
+
+
+if __name__ == "__main__":
+    # python relocate.py [category] — resume / finish an interrupted relocation
+    import sys
+
+    from storage import get_storage_client
+
+    only = sys.argv[1] if len(sys.argv) > 1 else None
+    count = relocate_objects(get_storage_client(), only)
+    print(f"Done: {count} object(s) relocated")
@@ -0,0 +1,98 @@
+"""Pydantic request/response schemas shared by the API and the snapshot exporter."""
+
+from typing import Optional, List, Union
+
+from pydantic import BaseModel
+
+
+class PhotoOut(BaseModel):
+    id: str
+    filename: str
+    url: str
+    category: str
+    title: Optional[str] = None
+    description: Optional[str] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    dzi_url: Optional[str] = None  # Deep Zoom tile manifest, only for very large photos
+    sort_order: int = 0
+    view_count: int = 0
+    download_count: int = 0
+    camera_make: Optional[str] = None
+    camera_model: Optional[str] = None
+    iso: Optional[int] = None
+    aperture: Optional[float] = None
+    shutter_speed: Optional[str] = None
+    focal_length: Optional[float] = None
+
+    class Config:
+        from_attributes = True
+
+
+class PaginatedPhotos(BaseModel):
+    items: List[PhotoOut]
+    total: int
+
+
+class PhotoArchiveRequest(BaseModel):
+    ids: List[str]  # photo IDs, in archive order
+
+
+class CategoryOut(BaseModel):
+    id: str
+    name: str
+    display_name: Optional[str] = None
+    sort_order: int = 0
+
+    class Config:
+        from_attributes = True
+
+
+class CategoryCreate(BaseModel):
+    name: str
+    display_name: Optional[str] = None
+
+
+class CategoryUpdate(BaseModel):
+    name: Optional[str] = None
+    display_name: Optional[str] = None
+
+
+class CategoryReorder(BaseModel):
+    ids: List[str]  # ordered list of category IDs
+
+
+class PhotoChangeOut(PhotoOut):
+    is_visible: bool = True
+
+
+class CategoryChangeOut(CategoryOut):
+    is_visible: bool = True
+
+
+class ChangeOut(BaseModel):
+    type: str  # "photo" | "category"
+    id: str
+    op: str  # "upsert" | "delete"
+    data: Optional[Union[PhotoChangeOut, CategoryChangeOut]] = None  # current row, for upserts
+
+
+class ChangeFeed(BaseModel):
+    changes: List[ChangeOut]
+    next: str  # pass back as ?since= on the next call
+    has_more: bool
+
+
+class SiteSettingsOut(BaseModel):
+    site_title: str = "TANGERINE"
+    site_subtitle: str = ""
+    contact_email: str = ""
+    weibo_url: str = ""
+    wechat_id: str = ""
+    xiaohongshu_url: str = ""
+    bilibili_url: str = ""
+    douyin_url: str = ""
+    footer_text: str = ""
+    about_photo_url: str = ""
+    about_bio_en: str = ""
+    about_bio_zh: str = ""
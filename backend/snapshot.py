@@ -0,0 +1,302 @@
+"""
+Static JSON snapshots of the public read endpoints, for the CDN to serve.
+
+``<prefix>/v2/index.json`` points at immutable per-generation ``g<n>/`` files.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import threading
+import time
+from typing import Iterable, Optional
+
+from sqlalchemy import func as sa_func
+from sqlalchemy.orm import Session
+
+from config import settings
+from database import SessionLocal, insert_ignore
+from models import Photo, Category, SiteSettings, SiteStats
+from schemas import PhotoOut, CategoryOut, SiteSettingsOut
+from storage import StorageClient
+
+# Bump when the file layout or JSON shape changes so old and new clients
+# never read each other's files.
+SNAPSHOT_VERSION = 2
+
+ALL_PHOTOS = "_all"
+
+GENERATION_KEY = "snapshot_generation"
+FILE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+INDEX_CACHE_CONTROL = "no-cache"
+PUBLISH_ATTEMPTS = 3
+
+
+def _base_prefix() -> str:
+    return f"{settings.snapshot_prefix.strip('/')}/v{SNAPSHOT_VERSION}"
+
+
+def snapshot_url(path: str) -> str:
+    """Public URL of a snapshot file, e.g. ``snapshot_url("index.json")``."""
+    return f"{settings.public_url}/{_base_prefix()}/{path}"
+
+
+# ---------------------------------------------------------------------------
+# Storage helpers
+# ---------------------------------------------------------------------------
+def _encode(payload) -> bytes:
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _put_json(storage: StorageClient, path: str, payload, cache_control: str) -> None:
+    _put_raw(storage, path, _encode(payload), cache_control)
+
+
+def _put_raw(storage: StorageClient, path: str, raw: bytes, cache_control: str) -> None:
+    key = f"{_base_prefix()}/{path}"
+    storage.put_object(
+        key, gzip.compress(raw, compresslevel=9), "application/json",
+        content_encoding="gzip", cache_control=cache_control,
+    )
+    if not settings.snapshot_brotli:
+        return
+    import brotli
+
+    storage.put_object(
+        f"{key}.br", brotli.compress(raw, quality=11), "application/json",
+        content_encoding="br", cache_control=cache_control,
+    )
+
+
+def _read_index(storage: StorageClient) -> dict:
+    """The published index, or ``{}`` (full export) if it can't be read."""
+    try:
+        data = storage.get_object(f"{_base_prefix()}/index.json")
+        # Some clients already undo the stored Content-Encoding on read
+        if data[:2] == b"\x1f\x8b":
+            data = gzip.decompress(data)
+        return json.loads(data)
+    except Exception as e:
+        print(f"Snapshot index not readable, exporting everything: {e}")
+        return {}
+
+
+def _generation(db: Session) -> int:
+    """The generation of the currently published index (0 before the first)."""
+    insert_ignore(db, SiteStats, [{"key": GENERATION_KEY, "value": 0}])
+    db.commit()
+    return db.query(SiteStats.value).filter(SiteStats.key == GENERATION_KEY).scalar()
+
+
+def _publish(storage: StorageClient, db: Session, index: dict) -> bool:
+    """Upload ``index`` unless another export published first (compare-and-set)."""
+    base = index["generation"] - 1
+    won = db.query(SiteStats).filter(
+        SiteStats.key == GENERATION_KEY, SiteStats.value == base,
+    ).update({SiteStats.value: base + 1}, synchronize_session=False)
+    if not won:
+        db.rollback()
+        return False
+    try:
+        _put_json(storage, "index.json", index, INDEX_CACHE_CONTROL)
+    except Exception:
+        db.rollback()
+        raise
+    db.commit()
+    return True
+
+
+# ---------------------------------------------------------------------------
+# Renderers
+# ---------------------------------------------------------------------------
+def _visible_photos(db: Session, category: Optional[str]):
+    q = db.query(Photo).filter(Photo.is_visible == True)
+    if category:
+        q = q.filter(Photo.category == category)
+    return q.order_by(Photo.sort_order.asc(), Photo.created_at.desc())
+
+
+def _photo_counts(db: Session) -> dict:
+    rows = (
+        db.query(Photo.category, sa_func.count(Photo.id))
+        .filter(Photo.is_visible == True)
+        .group_by(Photo.category)
+        .all()
+    )
+    return {name: count for name, count in rows}
+
+
+def _pages(db: Session, category: Optional[str]) -> Iterable[list]:
+    """The listing's rows a page at a time; an empty listing still gets one page."""
+    size = settings.snapshot_page_size
+    page: list = []
+    yielded = False
+    for photo in _visible_photos(db, category).yield_per(500):
+        page.append(PhotoOut.model_validate(photo).model_dump(mode="json"))
+        if len(page) == size:
+            yield page
+            page, yielded = [], True
+    if page or not yielded:
+        yield page
+
+
+def export_photo_pages(
+    storage: StorageClient, db: Session, category: Optional[str], generation: int,
+    previous: Optional[dict] = None,
+) -> dict:
+    """Render one listing (``None`` = all); pages unchanged since ``previous`` aren't re-uploaded."""
+    old_pages = (previous or {}).get("pages", [])
+    old_digests = (previous or {}).get("digests", [])
+    folder = category or ALL_PHOTOS
+    total, paths, digests = 0, [], []
+    for n, items in enumerate(_pages(db, category)):
+        total += len(items)
+        raw = _encode({"items": items})
+        digest = hashlib.sha256(raw).hexdigest()
+        if n < len(old_pages) and n < len(old_digests) and old_digests[n] == digest:
+            path = old_pages[n]
+        else:
+            path = f"g{generation}/photos/{folder}/page-{n}.json"
+            _put_raw(storage, path, raw, FILE_CACHE_CONTROL)
+        paths.append(path)
+        digests.append(digest)
+    return {"total": total, "pages": paths, "digests": digests}
+
+
+def export_categories(storage: StorageClient, db: Session, generation: int) -> str:
+    rows = (
+        db.query(Category)
+        .filter(Category.is_visible == True)
+        .order_by(Category.sort_order.asc())
+        .all()
+    )
+    path = f"g{generation}/categories.json"
+    _put_json(
+        storage, path,
+        [CategoryOut.model_validate(r).model_dump() for r in rows],
+        FILE_CACHE_CONTROL,
+    )
+    return path
+
+
+def export_settings(storage: StorageClient, db: Session, generation: int) -> str:
+    data = {r.key: r.value for r in db.query(SiteSettings).all()}
+    defaults = SiteSettingsOut().model_dump()
+    body = SiteSettingsOut(**{k: data.get(k, v) for k, v in defaults.items()})
+    path = f"g{generation}/settings.json"
+    _put_json(storage, path, body.model_dump(), FILE_CACHE_CONTROL)
+    return path
+
+
+# ---------------------------------------------------------------------------
+# Entry points
+# ---------------------------------------------------------------------------
+def _export(
+    storage: StorageClient,
+    photo_categories: Iterable[str] = (),
+    categories: bool = False,
+    site_settings: bool = False,
+    full: bool = False,
+) -> None:
+    """Export what changed (or everything, with ``full``) as a new generation."""
+    touched = {c for c in photo_categories if c}
+    for _ in range(PUBLISH_ATTEMPTS):
+        with SessionLocal() as db:
+            current = _generation(db)
+            previous = _read_index(storage)
+            if (full or previous.get("generation") != current
+                    or previous.get("page_size") != settings.snapshot_page_size):
+                previous = {}
+            generation = current + 1
+
+            # Listings always follow one GROUP BY, so a category that lost
+            # its last visible photo drops out of the index
+            counts = _photo_counts(db)
+            old_listings = previous.get("photos", {})
+            listings = {}
+            for name in [ALL_PHOTOS, *counts]:
+                stale = name in touched or (name == ALL_PHOTOS and touched)
+                if stale or name not in old_listings:
+                    listings[name] = export_photo_pages(
+                        storage, db, None if name == ALL_PHOTOS else name, generation,
+                        old_listings.get(name),
+                    )
+                else:
+                    listings[name] = old_listings[name]
+
+            index = {
+                "version": SNAPSHOT_VERSION,
+                "generation": generation,
+                "page_size": settings.snapshot_page_size,
+                "categories": (
+                    export_categories(storage, db, generation)
+                    if categories or "categories" not in previous else previous["categories"]
+                ),
+                "settings": (
+                    export_settings(storage, db, generation)
+                    if site_settings or "settings" not in previous else previous["settings"]
+                ),
+                "photos": listings,
+            }
+            if _publish(storage, db, index):
+                return
+    raise RuntimeError(f"gave up after {PUBLISH_ATTEMPTS} concurrent publishes")
+
+
+def export_all(storage: StorageClient) -> None:
+    """Full export: every listing page, categories and settings, then the index."""
+    _export(storage, full=True)
+
+
+_pending: dict = {}
+_pending_lock = threading.Lock()
+_worker: Optional[threading.Thread] = None
+
+
+def _merge(job: dict, photo_categories, categories: bool, site_settings: bool) -> None:
+    job.setdefault("photo_categories", set()).update(c for c in photo_categories if c)
+    job["categories"] = job.get("categories", False) or categories
+    job["site_settings"] = job.get("site_settings", False) or site_settings
+
+
+def _drain(storage: StorageClient) -> None:
+    global _worker
+    while True:
+        time.sleep(settings.snapshot_debounce_seconds)
+        with _pending_lock:
+            job = dict(_pending)
+            _pending.clear()
+            if not job:
+                _worker = None
+                return
+        try:
+            _export(storage, **job)
+        except Exception as e:
+            print(f"Snapshot export warning: {e}")
+
+
+def refresh(
+    storage: StorageClient,
+    photo_categories: Iterable[str] = (),
+    categories: bool = False,
+    site_settings: bool = False,
+) -> None:
+    """Queue a re-export of what an admin write touched; merged and run in the background."""
+    global _worker
+    if not settings.snapshot_enabled:
+        return
+    with _pending_lock:
+        _merge(_pending, photo_categories, categories, site_settings)
+        if _worker is None:
+            _worker = threading.Thread(target=_drain, args=(storage,), daemon=True)
+            _worker.start()
+
+
+if __name__ == "__main__":
+    # python snapshot.py — full rebuild, e.g. after enabling snapshots
+    from storage import get_storage_client
+
+    export_all(get_storage_client())
+    print(f"Snapshot exported to {snapshot_url('index.json')}")
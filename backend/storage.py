@@ -1,15 +1,17 @@
 """
-Unified storage abstraction — supports both Tencent COS and MinIO.
+Unified storage abstraction — supports Tencent COS, MinIO and in-memory.
 
 Set STORAGE_BACKEND=cos  (production) or STORAGE_BACKEND=minio (local dev)
-in your .env file.
+in your .env file.  STORAGE_BACKEND=memory keeps objects in-process, for
+benchmarks and tests.
 """
 
 from __future__ import annotations
 
 import json
+import threading
 from io import BytesIO
-from typing import Protocol
+from typing import Optional, Protocol
 
 from config import settings
 
@@ -20,7 +22,12 @@ from config import settings
 class StorageClient(Protocol):
     """Minimal duck-type interface used by the rest of the application."""
 
-    def put_object(self, key: str, data: bytes, content_type: str) -> None: ...
+    def put_object(
+        self, key: str, data: bytes, content_type: str,
+        content_encoding: Optional[str] = None, cache_control: Optional[str] = None,
+    ) -> None: ...
+    def get_object(self, key: str) -> bytes: ...
+    def copy_object(self, src_key: str, dst_key: str) -> None: ...
     def delete_object(self, key: str) -> None: ...
 
 
@@ -50,13 +57,38 @@ class CosStorageClient:
             self._client.create_bucket(Bucket=self._bucket)
         self._bucket_ready = True
 
-    def put_object(self, key: str, data: bytes, content_type: str) -> None:
+    def put_object(
+        self, key: str, data: bytes, content_type: str,
+        content_encoding: Optional[str] = None, cache_control: Optional[str] = None,
+    ) -> None:
         self._ensure_bucket()
+        extra = {}
+        if content_encoding:
+            extra["ContentEncoding"] = content_encoding
+        if cache_control:
+            extra["CacheControl"] = cache_control
         self._client.put_object(
             Bucket=self._bucket,
             Key=key,
             Body=data,
             ContentType=content_type,
+            **extra,
+        )
+
+    def get_object(self, key: str) -> bytes:
+        resp = self._client.get_object(Bucket=self._bucket, Key=key)
+        return resp["Body"].get_raw_stream().read()
+
+    def copy_object(self, src_key: str, dst_key: str) -> None:
+        # Server-side copy: the bytes never pass through this process
+        self._client.copy_object(
+            Bucket=self._bucket,
+            Key=dst_key,
+            CopySource={
+                "Bucket": self._bucket,
+                "Key": src_key,
+                "Region": settings.cos_region,
+            },
         )
 
     def delete_object(self, key: str) -> None:
@@ -99,20 +131,70 @@ class MinioStorageClient:
             self._client.set_bucket_policy(self._bucket, json.dumps(policy))
         self._bucket_ready = True
 
-    def put_object(self, key: str, data: bytes, content_type: str) -> None:
+    def put_object(
+        self, key: str, data: bytes, content_type: str,
+        content_encoding: Optional[str] = None, cache_control: Optional[str] = None,
+    ) -> None:
         self._ensure_bucket()
+        metadata = {}
+        if content_encoding:
+            metadata["Content-Encoding"] = content_encoding
+        if cache_control:
+            metadata["Cache-Control"] = cache_control
         self._client.put_object(
             self._bucket,
             key,
             BytesIO(data),
             length=len(data),
             content_type=content_type,
+            metadata=metadata or None,
         )
 
+    def get_object(self, key: str) -> bytes:
+        resp = self._client.get_object(self._bucket, key)
+        try:
+            # The stored bytes, even for objects with a Content-Encoding
+            return resp.read(decode_content=False)
+        finally:
+            resp.close()
+            resp.release_conn()
+
+    def copy_object(self, src_key: str, dst_key: str) -> None:
+        from minio.commonconfig import CopySource
+
+        self._client.copy_object(self._bucket, dst_key, CopySource(self._bucket, src_key))
+
     def delete_object(self, key: str) -> None:
         self._client.remove_object(self._bucket, key)
 
 
+# ---------------------------------------------------------------------------
+# In-process adapter (benchmarks / tests; nothing is publicly served)
+# ---------------------------------------------------------------------------
+class MemoryStorageClient:
+    def __init__(self):
+        self.objects: dict[str, tuple[bytes, str, Optional[str], Optional[str]]] = {}
+        self._lock = threading.Lock()
+
+    def put_object(
+        self, key: str, data: bytes, content_type: str,
+        content_encoding: Optional[str] = None, cache_control: Optional[str] = None,
+    ) -> None:
+        with self._lock:
+            self.objects[key] = (data, content_type, content_encoding, cache_control)
+
+    def get_object(self, key: str) -> bytes:
+        return self.objects[key][0]
+
+    def copy_object(self, src_key: str, dst_key: str) -> None:
+        with self._lock:
+            self.objects[dst_key] = self.objects[src_key]
+
+    def delete_object(self, key: str) -> None:
+        with self._lock:
+            self.objects.pop(key, None)
+
+
 # ---------------------------------------------------------------------------
 # Factory
 # ---------------------------------------------------------------------------
@@ -123,4 +205,31 @@ def get_storage_client() -> StorageClient:
         return MinioStorageClient()
     if backend == "cos":
         return CosStorageClient()
-    raise ValueError(f"Unknown STORAGE_BACKEND: {backend!r}  (use 'cos' or 'minio')")
+    if backend == "memory":
+        return MemoryStorageClient()
+    raise ValueError(
+        f"Unknown STORAGE_BACKEND: {backend!r}  (use 'cos', 'minio' or 'memory')"
+    )
+
+
+class LazyStorageClient:
+    """Builds the configured client (and imports its SDK) on first use.
+
+    Keeps the COS / MinIO SDK imports and credential setup off the import
+    path so workers boot fast and don't need storage reachable to start.
+    """
+
+    def __init__(self, factory=get_storage_client):
+        self._factory = factory
+        self._client: StorageClient | None = None
+        self._lock = threading.Lock()
+
+    def _get(self) -> StorageClient:
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._factory()
+        return self._client
+
+    def __getattr__(self, name):
+        return getattr(self._get(), name)
@@ -0,0 +1,87 @@
+"""LocalRateLimitBackend, driven by a fake clock.
+
+    cd backend && python -m pytest tests
+"""
+
+from ratelimit import LocalRateLimitBackend
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _backend(max_keys: int = 100):
+    clock = FakeClock()
+    return LocalRateLimitBackend(max_keys=max_keys, clock=clock), clock
+
+
+def test_bucket_allows_burst_then_refills():
+    backend, clock = _backend()
+    assert all(backend.take("ip", rate=2.0, burst=3) for _ in range(3))
+    assert not backend.take("ip", rate=2.0, burst=3)
+
+    clock.now += 0.25  # half a token
+    assert not backend.take("ip", rate=2.0, burst=3)
+    clock.now += 0.25
+    assert backend.take("ip", rate=2.0, burst=3)
+    assert not backend.take("ip", rate=2.0, burst=3)
+
+
+def test_bucket_refill_is_capped_at_burst():
+    backend, clock = _backend()
+    backend.take("ip", rate=1.0, burst=2)
+    clock.now += 3600
+    assert backend.take("ip", rate=1.0, burst=2)
+    assert backend.take("ip", rate=1.0, burst=2)
+    assert not backend.take("ip", rate=1.0, burst=2)
+
+
+def test_buckets_are_per_key():
+    backend, _ = _backend()
+    assert backend.take("a", rate=1.0, burst=1)
+    assert not backend.take("a", rate=1.0, burst=1)
+    assert backend.take("b", rate=1.0, burst=1)
+
+
+def test_least_recently_used_key_is_evicted():
+    backend, _ = _backend(max_keys=2)
+    backend.take("a", rate=1.0, burst=1)
+    backend.take("b", rate=1.0, burst=1)
+    backend.take("a", rate=1.0, burst=1)  # touch a, so b is the oldest
+    backend.take("c", rate=1.0, burst=1)
+
+    assert len(backend) == 2
+    assert not backend.take("a", rate=1.0, burst=1)  # a kept its empty bucket
+    assert backend.take("b", rate=1.0, burst=1)  # b was evicted: full again
+
+
+def test_seen_dedupes_within_window_only():
+    backend, clock = _backend()
+    assert not backend.seen("view:ip:photo", window=10)
+    clock.now += 9.9
+    assert backend.seen("view:ip:photo", window=10)
+    clock.now += 0.1
+    assert not backend.seen("view:ip:photo", window=10)
+    assert backend.seen("view:ip:photo", window=10)
+
+
+def test_repeat_does_not_extend_window():
+    backend, clock = _backend()
+    backend.seen("k", window=10)
+    clock.now += 5
+    assert backend.seen("k", window=10)
+    clock.now += 5
+    assert not backend.seen("k", window=10)
+
+
+def test_forget_clears_mark():
+    backend, _ = _backend()
+    backend.seen("k", window=10)
+    backend.forget("k")
+    assert len(backend) == 0
+    assert not backend.seen("k", window=10)
+    backend.forget("missing")  # no-op
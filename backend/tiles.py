@@ -0,0 +1,262 @@
+"""
+Deep Zoom (DZI) tile pyramids for very large photos.
+
+Photos at or above ``TILES_MIN_MEGAPIXELS`` get ``tiles/<id>/image.dzi`` (``dzi_url``)
+and ``image_files/<level>/<col>_<row>.jpg``; ``python tiles.py`` backfills older photos.
+"""
+
+from __future__ import annotations
+
+import math
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from io import BytesIO
+from typing import Iterator, List, Optional, Tuple
+
+from PIL import Image
+
+from config import settings
+from database import SessionLocal
+from models import Photo
+from storage import StorageClient
+import changes
+import snapshot
+
+# Process-wide, set once here: panoramas past Pillow's decompression-bomb
+# limit (~179 MP) are what this module exists for, and uploads are admin-only.
+Image.MAX_IMAGE_PIXELS = None
+
+DZI_XML = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<Image xmlns="http://schemas.microsoft.com/deepzoom/2008" '
+    'TileSize="{tile}" Overlap="{overlap}" Format="jpg">'
+    '<Size Width="{width}" Height="{height}"/></Image>\n'
+)
+
+
+def needs_tiles(width: Optional[int], height: Optional[int]) -> bool:
+    if not settings.tiles_enabled or not width or not height:
+        return False
+    return width * height >= settings.tiles_min_megapixels * 1_000_000
+
+
+def tiles_prefix(photo: Photo) -> str:
+    if photo.blob_sha256:
+        # Blob keys are unique per incarnation, so a re-upload never shares
+        # a prefix with a pyramid that is still being deleted
+        return "tiles/" + photo.object_key.rsplit("/", 1)[-1].rsplit(".", 1)[0]
+    return f"tiles/{photo.id}"
+
+
+def _max_level(width: int, height: int) -> int:
+    return math.ceil(math.log2(max(width, height, 1)))
+
+
+def _level_size(width: int, height: int, level: int, max_level: int) -> Tuple[int, int]:
+    scale = 2 ** (max_level - level)
+    return max(1, math.ceil(width / scale)), max(1, math.ceil(height / scale))
+
+
+def _grid(size: int) -> int:
+    return max(1, math.ceil(size / settings.tiles_size))
+
+
+def tile_keys(prefix: str, width: int, height: int) -> Iterator[str]:
+    """Every object key of a pyramid, manifest first (used for deletion)."""
+    yield f"{prefix}/image.dzi"
+    top = _max_level(width, height)
+    for level in range(top + 1):
+        w, h = _level_size(width, height, level, top)
+        for col in range(_grid(w)):
+            for row in range(_grid(h)):
+                yield f"{prefix}/image_files/{level}/{col}_{row}.jpg"
+
+
+# ---------------------------------------------------------------------------
+# Rendering
+# ---------------------------------------------------------------------------
+_pool: Optional[ProcessPoolExecutor] = None
+_jobs: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _worker_count() -> int:
+    return settings.tiles_workers or os.cpu_count() or 1
+
+
+def _process_pool() -> ProcessPoolExecutor:
+    """The encoder processes, started on first use and shared by every job."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: forking a threaded server process is not safe
+            _pool = ProcessPoolExecutor(
+                max_workers=_worker_count(),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def shutdown() -> None:
+    global _pool, _jobs
+    with _pool_lock:
+        if _jobs is not None:
+            _jobs.shutdown(wait=False, cancel_futures=True)
+            _jobs = None
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+
+def _encode_band(
+    raw: bytes, size: Tuple[int, int], level: int, row: int,
+    tile: int, overlap: int, quality: int,
+) -> List[Tuple[str, bytes]]:
+    """JPEG-encode the tiles of one tile row (runs in a worker process).
+
+    ``raw`` is the RGB band covering exactly that row, overlap included.
+    """
+    band = Image.frombytes("RGB", size, raw)
+    width, height = size
+    out = []
+    for col in range(math.ceil(width / tile)):
+        left = max(0, col * tile - overlap)
+        right = min(width, (col + 1) * tile + overlap)
+        buf = BytesIO()
+        band.crop((left, 0, right, height)).save(buf, "JPEG", quality=quality)
+        out.append((f"image_files/{level}/{col}_{row}.jpg", buf.getvalue()))
+    return out
+
+
+def _bands(img, level: int, tile: int, overlap: int) -> Iterator[tuple]:
+    """``_encode_band`` arguments for every tile row of ``img`` (minus settings)."""
+    w, h = img.size
+    for row in range(math.ceil(h / tile)):
+        top = max(0, row * tile - overlap)
+        bottom = min(h, (row + 1) * tile + overlap)
+        band = img.crop((0, top, w, bottom))
+        yield band.tobytes(), band.size, level, row
+
+
+def build_pyramid(storage: StorageClient, prefix: str, data: bytes, width: int, height: int) -> str:
+    """Cut and upload the pyramid for ``data``; returns the manifest's public URL."""
+    max_level = _max_level(width, height)
+    args = (settings.tiles_size, settings.tiles_overlap, settings.tiles_quality)
+    pool = _process_pool()
+    window = 2 * _worker_count()  # bands in flight per job
+
+    with ThreadPoolExecutor(max_workers=settings.tiles_upload_workers) as uploads:
+        uploaded = []
+
+        def _drain(future) -> None:
+            for name, body in future.result():
+                uploaded.append(uploads.submit(
+                    storage.put_object, f"{prefix}/{name}", body, "image/jpeg",
+                ))
+
+        with Image.open(BytesIO(data)) as src:
+            img = src.convert("RGB")
+        pending: deque = deque()
+        for level in range(max_level, -1, -1):
+            size = _level_size(width, height, level, max_level)
+            if img.size != size:
+                img = img.resize(size, Image.LANCZOS)  # from the level above
+            for band in _bands(img, level, settings.tiles_size, settings.tiles_overlap):
+                pending.append(pool.submit(_encode_band, *band, *args))
+                while len(pending) > window:
+                    _drain(pending.popleft())
+        while pending:
+            _drain(pending.popleft())
+        for future in uploaded:
+            future.result()
+
+    # Manifest last: viewers never see a pyramid with missing tiles
+    manifest = DZI_XML.format(
+        tile=settings.tiles_size, overlap=settings.tiles_overlap, width=width, height=height,
+    )
+    key = f"{prefix}/image.dzi"
+    storage.put_object(key, manifest.encode("utf-8"), "application/xml")
+    return f"{settings.public_url}/{key}"
+
+
+# ---------------------------------------------------------------------------
+# Pipeline entry points
+# ---------------------------------------------------------------------------
+def schedule(storage: StorageClient, photo_id: str) -> None:
+    """Queue ``generate_for_photo`` on the module's own ``TILES_MAX_JOBS`` threads."""
+    global _jobs
+    with _pool_lock:
+        if _jobs is None:
+            _jobs = ThreadPoolExecutor(
+                max_workers=max(1, settings.tiles_max_jobs), thread_name_prefix="tiles",
+            )
+        _jobs.submit(generate_for_photo, storage, photo_id)
+
+
+def generate_for_photo(storage: StorageClient, photo_id: str) -> None:
+    """Background task: build (or reuse) the pyramid for one photo."""
+    with SessionLocal() as db:
+        photo = db.query(Photo).filter_by(id=photo_id).first()
+        if photo is None or photo.dzi_url or not needs_tiles(photo.width, photo.height):
+            return
+        shared = photo.blob_sha256 and db.query(Photo.dzi_url).filter(
+            Photo.blob_sha256 == photo.blob_sha256, Photo.dzi_url.isnot(None),
+        ).first()
+        sha256, object_key, category = photo.blob_sha256, photo.object_key, photo.category
+        prefix, width, height = tiles_prefix(photo), photo.width, photo.height
+
+    # No session (or ORM row) is held during the build, which takes minutes
+    try:
+        if shared:
+            url = shared.dzi_url
+        else:
+            url = build_pyramid(storage, prefix, storage.get_object(object_key), width, height)
+    except Exception as e:
+        print(f"Tile pyramid warning: {photo_id}: {e}")
+        return
+
+    with SessionLocal() as db:
+        updated = db.query(Photo).filter(Photo.id == photo_id).update(
+            {Photo.dzi_url: url}, synchronize_session=False,
+        )
+        if updated:
+            changes.record(db, changes.PHOTO, [photo_id])
+            db.commit()
+        elif not shared and (sha256 is None or db.query(Photo.id).filter(
+            Photo.object_key == object_key,
+        ).first() is None):
+            # Deleted during the build, and nothing else uses these tiles
+            delete_pyramid(storage, prefix, width, height)
+    if updated:
+        snapshot.refresh(storage, photo_categories=[category])
+
+
+def delete_pyramid(storage: StorageClient, prefix: str, width: int, height: int) -> None:
+    """Background task: remove every tile of a pyramid (best effort)."""
+    def _delete(key: str) -> None:
+        try:
+            storage.delete_object(key)
+        except Exception:
+            pass
+
+    with ThreadPoolExecutor(max_workers=settings.tiles_upload_workers) as pool:
+        list(pool.map(_delete, tile_keys(prefix, width, height)))
+
+
+if __name__ == "__main__":
+    # python tiles.py — backfill pyramids for large photos that lack one
+    from storage import get_storage_client
+
+    client = get_storage_client()
+    with SessionLocal() as session:
+        ids = [
+            p.id for p in session.query(Photo.id, Photo.width, Photo.height)
+            .filter(Photo.dzi_url.is_(None))
+            if needs_tiles(p.width, p.height)
+        ]
+    for n, pid in enumerate(ids, 1):
+        generate_for_photo(client, pid)
+        print(f"{n}/{len(ids)} {pid}")
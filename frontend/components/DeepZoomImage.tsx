@@ -0,0 +1,118 @@
+"use client";
+
+import { useEffect, useRef, useState } from "react";
+
+interface DeepZoomImageProps {
+  dziUrl: string;
+  width: number;
+  height: number;
+  alt: string;
+  /** Max on-screen box, in CSS pixels */
+  maxWidth: number;
+  maxHeight: number;
+}
+
+interface Manifest {
+  tileSize: number;
+  overlap: number;
+}
+
+/**
+ * Renders a very large photo from its Deep Zoom tile pyramid instead of the
+ * original: only the tiles of the smallest level that still fills the screen
+ * (at the device pixel ratio) are fetched.
+ */
+export default function DeepZoomImage({
+  dziUrl,
+  width,
+  height,
+  alt,
+  maxWidth,
+  maxHeight,
+}: DeepZoomImageProps) {
+  const [manifest, setManifest] = useState<Manifest | null>(null);
+  const [dpr, setDpr] = useState(1);
+  const mounted = useRef(true);
+
+  useEffect(() => {
+    mounted.current = true;
+    setDpr(window.devicePixelRatio || 1);
+    fetch(dziUrl)
+      .then((res) => res.text())
+      .then((xml) => {
+        const doc = new DOMParser().parseFromString(xml, "application/xml");
+        const image = doc.documentElement;
+        if (!mounted.current) return;
+        setManifest({
+          tileSize: Number(image.getAttribute("TileSize")) || 254,
+          overlap: Number(image.getAttribute("Overlap")) || 0,
+        });
+      })
+      .catch(() => {});
+    return () => {
+      mounted.current = false;
+    };
+  }, [dziUrl]);
+
+  /* Fit inside the box, never upscale */
+  const fit = Math.min(maxWidth / width, maxHeight / height, 1);
+  const displayW = Math.round(width * fit);
+  const displayH = Math.round(height * fit);
+
+  if (!manifest) {
+    return <div style={{ width: displayW, height: displayH }} aria-label={alt} />;
+  }
+
+  /* Deep Zoom levels: maxLevel is full size, each level below halves it */
+  const maxLevel = Math.ceil(Math.log2(Math.max(width, height)));
+  const needed = Math.max(displayW, displayH) * dpr;
+  let level = maxLevel;
+  while (level > 0 && Math.max(width, height) / 2 ** (maxLevel - level + 1) >= needed) {
+    level--;
+  }
+  const levelScale = 2 ** (maxLevel - level);
+  const levelW = Math.ceil(width / levelScale);
+  const levelH = Math.ceil(height / levelScale);
+  const { tileSize, overlap } = manifest;
+  const cols = Math.ceil(levelW / tileSize);
+  const rows = Math.ceil(levelH / tileSize);
+  const scale = displayW / levelW;
+  const base = dziUrl.replace(/\.dzi$/, "_files");
+
+  const tiles = [];
+  for (let col = 0; col < cols; col++) {
+    for (let row = 0; row < rows; row++) {
+      const left = Math.max(0, col * tileSize - overlap);
+      const top = Math.max(0, row * tileSize - overlap);
+      const right = Math.min(levelW, (col + 1) * tileSize + overlap);
+      const bottom = Math.min(levelH, (row + 1) * tileSize + overlap);
+      tiles.push(
+        // eslint-disable-next-line @next/next/no-img-element
+        <img
+          key={`${level}/${col}_${row}`}
+          src={`${base}/${level}/${col}_${row}.jpg`}
+          alt=""
+          draggable={false}
+          className="absolute select-none"
+          style={{
+            left: left * scale,
+            top: top * scale,
+            width: (right - left) * scale,
+            height: (bottom - top) * scale,
+          }}
+        />
+      );
+    }
+  }
+
+  return (
+    <div
+      className="relative overflow-hidden"
+      style={{ width: displayW, height: displayH }}
+      role="img"
+      aria-label={alt}
+    >
+      {tiles}
+    </div>
+  );
+}
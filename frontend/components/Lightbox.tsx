@@ -3,6 +3,7 @@
 import { useState, useEffect, useCallback, useRef } from "react";
 import { Photo, trackPhotoView } from "@/lib/api";
 import { useI18n } from "@/lib/i18n";
+import DeepZoomImage from "./DeepZoomImage";
 
 interface LightboxProps {
   photos: Photo[];
@@ -100,13 +101,26 @@ export default function Lightbox({
         className={`max-w-[92vw] flex items-center justify-center ${showInfoBar ? "max-h-[88vh]" : "max-h-[92vh]"}`}
         onClick={(e) => e.stopPropagation()}
       >
-        {/* eslint-disable-next-line @next/next/no-img-element */}
-        <img
-          src={photo.url}
-          alt={photo.title || ""}
-          className={`max-w-full object-contain select-none ${showInfoBar ? "max-h-[86vh]" : "max-h-[90vh]"}`}
-          draggable={false}
-        />
+        {photo.dzi_url && photo.width && photo.height && typeof window !== "undefined" ? (
+          /* Very large photos: fetch only the tiles needed at screen size */
+          <DeepZoomImage
+            key={photo.id}
+            dziUrl={photo.dzi_url}
+            width={photo.width}
+            height={photo.height}
+            alt={photo.title || ""}
+            maxWidth={window.innerWidth * 0.92}
+            maxHeight={window.innerHeight * (showInfoBar ? 0.86 : 0.9)}
+          />
+        ) : (
+          /* eslint-disable-next-line @next/next/no-img-element */
+          <img
+            src={photo.url}
+            alt={photo.title || ""}
+            className={`max-w-full object-contain select-none ${showInfoBar ? "max-h-[86vh]" : "max-h-[90vh]"}`}
+            draggable={false}
+          />
+        )}
       </div>
 
       {/* Next */}
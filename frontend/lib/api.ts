@@ -54,6 +54,7 @@ export interface Photo {
   description?: string;
   width?: number;
   height?: number;
+  dzi_url?: string;
   sort_order: number;
   view_count: number;
   download_count: number;
@@ -103,6 +104,15 @@ export async function login(
 }
 
 export function logout() {
+  const token = getToken();
+  if (token) {
+    // Revoke server-side too — fire-and-forget, the local token goes regardless
+    api
+      .post("/api/auth/logout", null, {
+        headers: { Authorization: `Bearer ${token}` },
+      })
+      .catch(() => {});
+  }
   clearToken();
 }
 